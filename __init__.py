@@ -1,37 +1,235 @@
 from homeassistant.const import CONF_HOST, CONF_USERNAME, CONF_PASSWORD, Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
 from homeassistant.config_entries import ConfigEntry
-from .const import DOMAIN
-from .wdmycloud import MyCloudClient
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import STORAGE_DIR, Store
+from homeassistant.util import dt as dt_util
+import aiohttp
+import asyncio
+import logging
+import shutil
+import time
+import voluptuous as vol
+from .const import (
+    DOMAIN,
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_HOURS,
+    ATTR_RESOLUTION,
+    ATTR_SERIES,
+    CONF_MAX_CONCURRENT,
+    CONF_RETRIES,
+    CONF_TIMEOUT,
+    CONNECT_TIMEOUT,
+    DATA_FLEET,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_RETRIES,
+    HISTORY_DIR,
+    HISTORY_FLUSH_INTERVAL,
+    MAX_CONCURRENT_REQUESTS,
+    SERVICE_GET_HISTORY,
+    SNAPSHOT_SAVE_DELAY,
+    SNAPSHOT_STORAGE_KEY,
+    STORAGE_KEY,
+    STORAGE_VERSION,
+)
+from .coordinator import WDMyCloudDataUpdateCoordinator
+from .fleet import FleetScheduler
+from .history import RESOLUTIONS, HistoryStore
+from .wdmycloud import AsyncMyCloudClient
+
+_LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.SENSOR, Platform.SWITCH, Platform.BUTTON]
 
+def _session_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store holding the entry's session cookies."""
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}.{entry.entry_id}")
+
+def _snapshot_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store holding the entry's last refreshed data."""
+    return Store(hass, STORAGE_VERSION, f"{SNAPSHOT_STORAGE_KEY}.{entry.entry_id}")
+
+async def _async_connect(coordinator, entry: ConfigEntry, logged_in: bool, start_polling) -> None:
+    """Log in if needed, replace restored data with a fresh refresh, then poll."""
+    if not logged_in:
+        try:
+            await coordinator.client.login(entry.data[CONF_USERNAME], entry.data[CONF_PASSWORD])
+        except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+            # The refresh logs in again with the stored credentials
+            _LOGGER.debug("Logging in to %s failed: %s", entry.data[CONF_HOST], err)
+    await coordinator.async_refresh()
+    start_polling()
+
+def _history_path(hass: HomeAssistant, entry: ConfigEntry) -> str:
+    """Return the directory holding the entry's reading history."""
+    return hass.config.path(STORAGE_DIR, HISTORY_DIR, entry.entry_id)
+
+GET_HISTORY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_SERIES): cv.string,
+    vol.Optional(ATTR_RESOLUTION): vol.All(
+        vol.Coerce(int), vol.In([resolution for resolution, _ in RESOLUTIONS])
+    ),
+    vol.Optional(ATTR_HOURS): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+})
+
+async def _async_get_history(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Return saved buckets of a series for every device, or the one asked for."""
+    hours = call.data.get(ATTR_HOURS)
+    start = time.time() - hours * 3600 if hours else None
+    devices = {}
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        coordinator = hass.data[DOMAIN].get(entry.entry_id)
+        if coordinator is None or call.data.get(ATTR_CONFIG_ENTRY_ID, entry.entry_id) != entry.entry_id:
+            continue
+        rows = coordinator.client.history.query(
+            call.data[ATTR_SERIES], call.data.get(ATTR_RESOLUTION), start
+        )
+        devices[entry.entry_id] = {
+            "title": entry.title,
+            "buckets": [
+                {**row, "start": dt_util.utc_from_timestamp(row["start"]).isoformat()}
+                for row in rows
+            ],
+        }
+    return {"devices": devices}
+
+def _async_get_fleet(hass: HomeAssistant) -> FleetScheduler:
+    """Return the scheduler shared by every entry."""
+    fleet = hass.data[DOMAIN].get(DATA_FLEET)
+    if fleet is None:
+        fleet = hass.data[DOMAIN][DATA_FLEET] = FleetScheduler()
+    return fleet
+
+def _async_release_fleet(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Stop polling an entry and the scheduler once no entries are left."""
+    fleet = hass.data[DOMAIN][DATA_FLEET]
+    fleet.remove(entry.entry_id)
+    if not len(fleet) and fleet.task is not None:
+        fleet.task.cancel()
+        fleet.task = None
+
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the WD MyCloud component."""
     hass.data.setdefault(DOMAIN, {})
+
+    async def get_history(call: ServiceCall) -> ServiceResponse:
+        return await _async_get_history(hass, call)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_GET_HISTORY, get_history,
+        schema=GET_HISTORY_SCHEMA, supports_response=SupportsResponse.ONLY,
+    )
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up WD MyCloud from a config entry."""
-    client = MyCloudClient(entry.data[CONF_HOST])
-    
-    # Login to the device
-    if not await hass.async_add_executor_job(
-        client.login, 
-        entry.data[CONF_USERNAME], 
-        entry.data[CONF_PASSWORD]
-    ):
-        return False
-
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = client
+    fleet = _async_get_fleet(hass)
+
+    # Share HA's connection pool but keep a private cookie jar that accepts
+    # cookies from IP hosts, which is how the NAS tracks the login session
+    session = async_create_clientsession(
+        hass, cookie_jar=aiohttp.CookieJar(unsafe=True)
+    )
+    client = AsyncMyCloudClient(
+        entry.data[CONF_HOST],
+        session,
+        max_concurrent=entry.options.get(CONF_MAX_CONCURRENT, MAX_CONCURRENT_REQUESTS),
+        timeout=(
+            CONNECT_TIMEOUT,
+            entry.options.get(CONF_TIMEOUT, DEFAULT_REQUEST_TIMEOUT),
+        ),
+        retries=entry.options.get(CONF_RETRIES, DEFAULT_RETRIES),
+        budget=fleet.budget,
+    )
+    client.set_credentials(entry.data[CONF_USERNAME], entry.data[CONF_PASSWORD])
+
+    # Reuse the session cookie from the last run; if it has expired the
+    # client logs in again on the first request that is rejected
+    store = _session_store(hass, entry)
+    client.on_login = lambda: store.async_delay_save(client.export_cookies, 1)
+    # Temperature, storage and media counts are kept beyond the latest value
+    history = HistoryStore(_history_path(hass, entry))
+    await hass.async_add_executor_job(history.load)
+    client.history = history
+
+    async def flush_history(now=None) -> None:
+        await hass.async_add_executor_job(history.flush)
+
+    entry.async_on_unload(
+        async_track_time_interval(hass, flush_history, HISTORY_FLUSH_INTERVAL)
+    )
+
+    snapshots = _snapshot_store(hass, entry)
+    cookies, snapshot = await asyncio.gather(store.async_load(), snapshots.async_load())
+    if cookies:
+        client.import_cookies(cookies)
+
+    coordinator = WDMyCloudDataUpdateCoordinator(hass, client, entry)
+    await hass.async_add_executor_job(coordinator.forecast.seed, history)
+
+    # The fleet only takes over once the first refresh has finished, so it
+    # never runs a second one alongside the background connect
+    def start_polling() -> None:
+        fleet.add(entry.entry_id, coordinator.async_refresh, coordinator.next_interval)
+        if fleet.task is None:
+            fleet.task = hass.async_create_background_task(
+                fleet.run(), "wd_mycloud fleet scheduler"
+            )
+
+    if snapshot:
+        # Start entities from the last known data and contact the device in
+        # the background, so a slow or sleeping NAS does not hold up startup
+        coordinator.async_set_updated_data(snapshot)
+        entry.async_create_background_task(
+            hass, _async_connect(coordinator, entry, bool(cookies), start_polling),
+            f"wd_mycloud connect {entry.entry_id}",
+        )
+    else:
+        if not cookies and not await client.login(
+            entry.data[CONF_USERNAME],
+            entry.data[CONF_PASSWORD]
+        ):
+            return False
+        await coordinator.async_config_entry_first_refresh()
+        start_polling()
+
+    def save_snapshot() -> None:
+        if coordinator.last_update_success:
+            snapshots.async_delay_save(lambda: coordinator.data, SNAPSHOT_SAVE_DELAY)
+
+    entry.async_on_unload(coordinator.async_add_listener(save_snapshot))
+
+    hass.data[DOMAIN][entry.entry_id] = coordinator
+    coordinator.reschedule = lambda: fleet.reschedule(entry.entry_id)
+    entry.async_on_unload(lambda: _async_release_fleet(hass, entry))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     return True
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await hass.async_add_executor_job(coordinator.client.history.flush)
+        if coordinator.data:
+            # A reload should start from the newest data, not a delayed save
+            await _snapshot_store(hass, entry).async_save(coordinator.data)
     return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the saved session, data and history when the entry is deleted."""
+    await _session_store(hass, entry).async_remove()
+    await _snapshot_store(hass, entry).async_remove()
+    await hass.async_add_executor_job(
+        shutil.rmtree, _history_path(hass, entry), True
+    )
@@ -3,6 +3,7 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from .const import DOMAIN
+from .power import POWER_REBOOT, POWER_SHUTDOWN
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -10,11 +11,11 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the WD MyCloud buttons."""
-    client = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
     
     entities = [
-        WDMyCloudRebootButton(client, config_entry.entry_id),
-        WDMyCloudShutdownButton(client, config_entry.entry_id)
+        WDMyCloudRebootButton(coordinator, config_entry.entry_id),
+        WDMyCloudShutdownButton(coordinator, config_entry.entry_id)
     ]
     
     async_add_entities(entities)
@@ -22,9 +23,9 @@ async def async_setup_entry(
 class WDMyCloudRebootButton(ButtonEntity):
     """Representation of WD MyCloud reboot button."""
 
-    def __init__(self, client, entry_id):
+    def __init__(self, coordinator, entry_id):
         """Initialize the reboot button."""
-        self._client = client
+        self._coordinator = coordinator
         self._entry_id = entry_id
         self._attr_name = "WD MyCloud Reboot"
         self._attr_unique_id = f"{entry_id}_reboot"
@@ -39,15 +40,15 @@ class WDMyCloudRebootButton(ButtonEntity):
         }
 
     async def async_press(self) -> None:
-        """Handle the button press."""
-        await self.hass.async_add_executor_job(self._client.reboot_system)
+        """Reboot and follow the device until it is ready again."""
+        await self._coordinator.async_power_action(POWER_REBOOT)
 
 class WDMyCloudShutdownButton(ButtonEntity):
     """Representation of WD MyCloud shutdown button."""
 
-    def __init__(self, client, entry_id):
+    def __init__(self, coordinator, entry_id):
         """Initialize the shutdown button."""
-        self._client = client
+        self._coordinator = coordinator
         self._entry_id = entry_id
         self._attr_name = "WD MyCloud Shutdown"
         self._attr_unique_id = f"{entry_id}_shutdown"
@@ -62,5 +63,5 @@ class WDMyCloudShutdownButton(ButtonEntity):
         }
 
     async def async_press(self) -> None:
-        """Handle the button press."""
-        await self.hass.async_add_executor_job(self._client.shutdown_system)
+        """Shut down and follow the device until it is off."""
+        await self._coordinator.async_power_action(POWER_SHUTDOWN)
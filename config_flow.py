@@ -1,8 +1,21 @@
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST, CONF_USERNAME, CONF_PASSWORD
 import voluptuous as vol
-from .const import DOMAIN, SCAN_INTERVAL
-from .wdmycloud import MyCloudClient
+from .const import (
+    DOMAIN,
+    SCAN_INTERVAL,
+    SLOW_INTERVAL,
+    CONF_SCAN_INTERVAL,
+    CONF_SLOW_INTERVAL,
+    CONF_TIMEOUT,
+    CONF_RETRIES,
+    CONF_MAX_CONCURRENT,
+    CONF_EVENT_MODE,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_RETRIES,
+    MAX_CONCURRENT_REQUESTS,
+)
+from .wdmycloud import AsyncMyCloudClient
 import logging
 from typing import Any, Dict, Optional
 
@@ -18,10 +31,10 @@ class WDMyCloudConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
 
         if user_input is not None:
+            # A private session, closed once the credentials are checked
+            client = AsyncMyCloudClient(user_input[CONF_HOST])
             try:
-                client = MyCloudClient(user_input[CONF_HOST])
-                success = await self.hass.async_add_executor_job(
-                    client.login,
+                success = await client.login(
                     user_input[CONF_USERNAME],
                     user_input[CONF_PASSWORD]
                 )
@@ -36,6 +49,8 @@ class WDMyCloudConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             except Exception as ex:
                 _LOGGER.error("Connection failed: %s", str(ex))
                 errors["base"] = "cannot_connect"
+            finally:
+                await client.close()
 
         return self.async_show_form(
             step_id="user",
@@ -47,6 +62,39 @@ class WDMyCloudConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
         )
 
+    async def async_step_reauth(self, entry_data: Dict[str, Any]):
+        """Ask for new credentials when the device rejects the stored ones."""
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(self, user_input: Optional[Dict[str, Any]] = None):
+        """Check the new credentials and reload the entry with them."""
+        errors = {}
+        entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
+
+        if user_input is not None:
+            client = AsyncMyCloudClient(entry.data[CONF_HOST])
+            try:
+                if await client.login(user_input[CONF_USERNAME], user_input[CONF_PASSWORD]):
+                    return self.async_update_reload_and_abort(
+                        entry, data={**entry.data, **user_input}
+                    )
+                errors["base"] = "invalid_auth"
+            except Exception as ex:
+                _LOGGER.error("Connection failed: %s", str(ex))
+                errors["base"] = "cannot_connect"
+            finally:
+                await client.close()
+
+        return self.async_show_form(
+            step_id="reauth_confirm",
+            data_schema=vol.Schema({
+                vol.Required(CONF_USERNAME, default=entry.data[CONF_USERNAME]): str,
+                vol.Required(CONF_PASSWORD): str,
+            }),
+            description_placeholders={"host": entry.data[CONF_HOST]},
+            errors=errors,
+        )
+
     @staticmethod
     def async_get_options_flow(config_entry):
         """Get the options flow for this handler."""
@@ -68,10 +116,38 @@ class WDMyCloudOptionsFlow(config_entries.OptionsFlow):
             step_id="init",
             data_schema=vol.Schema({
                 vol.Required(
-                    "scan_interval",
+                    CONF_SCAN_INTERVAL,
                     default=self.config_entry.options.get(
-                        "scan_interval", SCAN_INTERVAL
+                        CONF_SCAN_INTERVAL, int(SCAN_INTERVAL.total_seconds())
                     ),
                 ): vol.All(vol.Coerce(int), vol.Range(min=10, max=300)),
+                vol.Required(
+                    CONF_SLOW_INTERVAL,
+                    default=self.config_entry.options.get(
+                        CONF_SLOW_INTERVAL, int(SLOW_INTERVAL.total_seconds())
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=300, max=86400)),
+                vol.Required(
+                    CONF_TIMEOUT,
+                    default=self.config_entry.options.get(
+                        CONF_TIMEOUT, DEFAULT_REQUEST_TIMEOUT
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=60)),
+                vol.Required(
+                    CONF_RETRIES,
+                    default=self.config_entry.options.get(
+                        CONF_RETRIES, DEFAULT_RETRIES
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3)),
+                vol.Required(
+                    CONF_MAX_CONCURRENT,
+                    default=self.config_entry.options.get(
+                        CONF_MAX_CONCURRENT, MAX_CONCURRENT_REQUESTS
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=5)),
+                vol.Required(
+                    CONF_EVENT_MODE,
+                    default=self.config_entry.options.get(CONF_EVENT_MODE, False),
+                ): bool,
             }),
         )
@@ -1,10 +1,107 @@
 from datetime import timedelta
 
+from .wdmycloud import DEFAULT_RETRIES, DEFAULT_TIMEOUT
+
 DOMAIN = "wd_mycloud"
 SCAN_INTERVAL = timedelta(seconds=60)  # Ändra till timedelta-objekt
 
 CONF_HOST = "host"
 CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
+CONF_SCAN_INTERVAL = "scan_interval"
+CONF_SLOW_INTERVAL = "slow_interval"
+CONF_TIMEOUT = "timeout"
+CONF_RETRIES = "retries"
+CONF_MAX_CONCURRENT = "max_concurrent"
+CONF_EVENT_MODE = "event_mode"
+
+# Polling tiers: static endpoints are read once per session, slow ones on
+# CONF_SLOW_INTERVAL and fast ones on every CONF_SCAN_INTERVAL refresh
+TIER_STATIC = "static"
+TIER_SLOW = "slow"
+TIER_FAST = "fast"
+
+SLOW_INTERVAL = timedelta(hours=1)
+
+ENDPOINT_TIERS = {
+    "system_info": TIER_STATIC,
+    "firmware_info": TIER_SLOW,
+    "storage_usage": TIER_SLOW,
+    "system_state": TIER_FAST,
+    "media_status": TIER_FAST,
+    # Settings only change when toggled, which updates state optimistically
+    "led_status": TIER_SLOW,
+    "hdd_standby": TIER_SLOW,
+}
+
+# Endpoints whose handlers read the data volume, so polling them keeps the
+# disks from spinning down
+DISK_ENDPOINTS = {"system_state", "storage_usage", "media_status"}
+
+# While HDD standby is enabled, disk endpoints are polled at most once per
+# this many standby periods so the disks can actually go to sleep
+STANDBY_POLL_FACTOR = 3
+
+# Fast endpoints double their interval each time they return an unchanged
+# value, up to this many seconds
+IDLE_INTERVAL_MAX = 900
+
+# media crawler volume_state values meaning indexing is in progress; any
+# other value, including an empty or unknown one, is polled as usual
+CRAWLER_ACTIVE_STATES = {"scanning", "indexing", "crawling", "extracting", "running"}
+
+# Seconds between media_status polls while the crawler is indexing
+CRAWLER_POLL_INTERVAL = 15
+
+# Event mode: the watched endpoint is polled every WATCH_INTERVAL seconds and
+# a change in any of WATCH_FIELDS refreshes WATCH_TRIGGERS at once. Those are
+# otherwise only polled every WATCH_BACKSTOP seconds.
+WATCH_ENDPOINT = "system_state"
+WATCH_FIELDS = ("Status", "SMART", "Volume", "Free Space", "Overall")
+WATCH_TRIGGERS = {"media_status", "storage_usage"}
+WATCH_INTERVAL = 10
+WATCH_BACKSTOP = 900
+
+# Endpoint read, with its own timeout in seconds, to check whether a device
+# that stopped answering is back
+PROBE_ENDPOINT = "device_info"
+PROBE_TIMEOUT = 5
 
 DEFAULT_NAME = "WD MyCloud"
+
+# Key in hass.data[DOMAIN] holding the FleetScheduler shared by all entries
+DATA_FLEET = "fleet"
+
+# Session cookies are kept in .storage so restarts can skip local_login
+STORAGE_VERSION = 1
+STORAGE_KEY = "wd_mycloud.session"
+
+# The last refreshed data is kept in .storage so entities can start from it
+# while the device is contacted in the background; saved at most this often
+SNAPSHOT_STORAGE_KEY = "wd_mycloud.snapshot"
+SNAPSHOT_SAVE_DELAY = 60
+
+# Directory in .storage holding each entry's HistoryStore, and how often
+# new readings are written to it
+HISTORY_DIR = "wd_mycloud_history"
+HISTORY_FLUSH_INTERVAL = timedelta(minutes=5)
+
+SERVICE_GET_HISTORY = "get_history"
+ATTR_SERIES = "series"
+ATTR_RESOLUTION = "resolution"
+ATTR_HOURS = "hours"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+
+# Requests allowed in flight at once against a single device
+MAX_CONCURRENT_REQUESTS = 3
+
+# Seconds to establish a connection and to wait for each response; the
+# client's defaults, as are the DEFAULT_RETRIES imported above
+CONNECT_TIMEOUT, DEFAULT_REQUEST_TIMEOUT = DEFAULT_TIMEOUT
+
+# Seconds each attempt to read an endpoint may take before it is retried or
+# its previous value is reused; never less than connect plus read timeout
+ENDPOINT_TIMEOUT = 10
+ENDPOINT_TIMEOUTS = {
+    "media_status": 20,  # mediacrawler_status is slow while indexing
+}
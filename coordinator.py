@@ -0,0 +1,380 @@
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed, HomeAssistantError
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+import asyncio
+import aiohttp
+import logging
+import math
+import time
+from .const import (
+    DOMAIN,
+    SCAN_INTERVAL,
+    SLOW_INTERVAL,
+    CONF_SCAN_INTERVAL,
+    CONF_SLOW_INTERVAL,
+    CONF_EVENT_MODE,
+    CRAWLER_ACTIVE_STATES,
+    CRAWLER_POLL_INTERVAL,
+    DISK_ENDPOINTS,
+    ENDPOINT_TIERS,
+    ENDPOINT_TIMEOUT,
+    ENDPOINT_TIMEOUTS,
+    IDLE_INTERVAL_MAX,
+    PROBE_ENDPOINT,
+    PROBE_TIMEOUT,
+    STANDBY_POLL_FACTOR,
+    TIER_FAST,
+    TIER_STATIC,
+    TIER_SLOW,
+    WATCH_BACKSTOP,
+    WATCH_ENDPOINT,
+    WATCH_FIELDS,
+    WATCH_INTERVAL,
+    WATCH_TRIGGERS,
+)
+from .crawler import CrawlerProgress
+from .forecast import CapacityForecast
+from .fleet import CircuitBreaker, health_rank
+from .power import (
+    POWER_AUTHENTICATED,
+    POWER_GOING_DOWN,
+    POWER_IDLE,
+    POWER_OFF,
+    POWER_REBOOT,
+    POWER_TIMED_OUT,
+    PowerTracker,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WDMyCloudDataUpdateCoordinator(DataUpdateCoordinator):
+    """Poll the NAS endpoints according to their tier in ENDPOINT_TIERS.
+
+    Intervals adapt to device activity and HDD standby; the circuit breaker
+    and PowerTracker take over polling while the device is unreachable or
+    rebooting. Listeners subscribe with an endpoint or (endpoint, field)
+    context and are only notified when it changed.
+    """
+
+    def __init__(self, hass: HomeAssistant, client, config_entry: ConfigEntry):
+        """Initialize the coordinator."""
+        options = config_entry.options
+        # Polling is driven by the shared FleetScheduler, not a timer per entry
+        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=None)
+        self.client = client
+        self.poll_interval = options.get(CONF_SCAN_INTERVAL, SCAN_INTERVAL.total_seconds())
+        self.slow_interval = options.get(
+            CONF_SLOW_INTERVAL, SLOW_INTERVAL.total_seconds()
+        )
+        self.event_mode = options.get(CONF_EVENT_MODE, False)
+        # Monotonic time of the last successful fetch per endpoint
+        self._last_fetched = {}
+        # Consecutive fetches per endpoint that returned an unchanged value
+        self._unchanged = {}
+        self._temperature_rising = False
+        self.media_progress = CrawlerProgress()
+        # Seeded from the client's history by the integration at setup
+        self.forecast = CapacityForecast()
+        # Contexts changed by the last update; None notifies every listener
+        self._changed = None
+        self._notified_success = None
+        self.breaker = CircuitBreaker()
+        self.power = PowerTracker()
+        # Called when next_interval changed outside a refresh; set by the
+        # integration so the fleet asks again
+        self.reschedule = None
+        # Seconds the last refresh took, shown as a diagnostic sensor
+        self.refresh_duration = None
+
+    @property
+    def crawler_active(self):
+        """Return True while the media crawler reports indexing work."""
+        media = (self.data or {}).get("media_status") or {}
+        state = media.get("Volume State")
+        return state is not None and state.strip().lower() in CRAWLER_ACTIVE_STATES
+
+    def _standby_minutes(self):
+        standby = (self.data or {}).get("hdd_standby") or {}
+        return standby.get("minutes") if standby.get("enabled") else None
+
+    def interval(self, key):
+        """Return the seconds between fetches of an endpoint right now."""
+        tier = ENDPOINT_TIERS[key]
+        if tier == TIER_STATIC:
+            return math.inf
+        interval = self.slow_interval if tier == TIER_SLOW else self.poll_interval
+        if self.event_mode:
+            if key == WATCH_ENDPOINT:
+                # The watcher stays quick; only HDD standby holds it back
+                return self._standby_bound(key, WATCH_INTERVAL)
+            if key in WATCH_TRIGGERS:
+                interval = max(interval, WATCH_BACKSTOP)
+
+        # The disks are awake anyway while indexing, so there is nothing to save
+        if key in DISK_ENDPOINTS and self.crawler_active:
+            if key == "media_status":
+                return min(interval, CRAWLER_POLL_INTERVAL)
+            return interval
+        if key == "system_state" and self._temperature_rising:
+            return interval
+
+        if tier == TIER_FAST:
+            interval = min(
+                interval * 2 ** self._unchanged.get(key, 0),
+                max(interval, IDLE_INTERVAL_MAX),
+            )
+        return self._standby_bound(key, interval)
+
+    def _standby_bound(self, key, interval):
+        minutes = self._standby_minutes()
+        if key in DISK_ENDPOINTS and minutes:
+            return max(interval, minutes * 60 * STANDBY_POLL_FACTOR)
+        return interval
+
+    def _shortest_interval(self):
+        return min(self.poll_interval, *map(self.interval, ENDPOINT_TIERS))
+
+    def _is_due(self, key, now):
+        """Return True if the endpoint should be fetched this refresh."""
+        last = self._last_fetched.get(key)
+        if last is None:
+            return True
+        # Fleet polls land within a poll of the due time; fetch early rather
+        # than a whole poll late
+        return now - last >= self.interval(key) - self._shortest_interval() / 2
+
+    def next_interval(self):
+        """Return the seconds until an endpoint is next due, for the fleet."""
+        now = time.monotonic()
+        if self.power.active:
+            return self.power.probe_in(now)
+        if self.breaker.is_open:
+            return self.breaker.probe_in(now)
+        remaining = min(
+            self.interval(key) - (now - self._last_fetched[key])
+            if key in self._last_fetched else 0
+            for key in ENDPOINT_TIERS
+        )
+        # Endpoints that keep failing are retried at the normal pace, not in a loop
+        return max(remaining, self._shortest_interval())
+
+    def _watch_triggered(self, results):
+        """Return True if the watched status differs from the previous refresh."""
+        if not self.event_mode or self.data is None:
+            return False
+        old = self.data.get(WATCH_ENDPOINT) or {}
+        for key, value, ok in results:
+            if key == WATCH_ENDPOINT and ok and value is not None:
+                return any(value.get(field) != old.get(field) for field in WATCH_FIELDS)
+        return False
+
+    def _track_changes(self, key, old, new):
+        """Update the unchanged streak and temperature trend for a new value."""
+        if new == old:
+            self._unchanged[key] = min(self._unchanged.get(key, 0) + 1, 16)
+        else:
+            self._unchanged[key] = 0
+        if key == "system_state":
+            old_temperature = (old or {}).get("Temperature")
+            new_temperature = new.get("Temperature")
+            self._temperature_rising = (
+                old_temperature is not None and new_temperature is not None
+                and health_rank(new_temperature) > health_rank(old_temperature)
+            )
+
+    def invalidate(self, *keys):
+        """Force the given endpoints (all if none given) to be fetched next refresh."""
+        for key in keys or list(self._last_fetched):
+            self._last_fetched.pop(key, None)
+        self.client.invalidate(*keys)
+
+    @callback
+    def async_set_endpoint_data(self, key, value):
+        """Store a known endpoint value, e.g. after a successful write."""
+        old = self.data or {}
+        self.data = {**old, key: value}
+        self._last_fetched[key] = time.monotonic()
+        self._changed = _diff(old, self.data)
+        self.async_update_listeners()
+        # A change to HDD standby moves when the disk endpoints are due
+        if self.reschedule is not None:
+            self.reschedule()
+
+    @callback
+    def async_update_listeners(self):
+        """Notify the listeners whose context changed in the last update."""
+        changed, self._changed = self._changed, None
+        if changed is None or self.last_update_success != self._notified_success:
+            # First data, or entities need to pick up a change in availability
+            self._notified_success = self.last_update_success
+            super().async_update_listeners()
+            return
+        self._async_notify(changed)
+
+    @callback
+    def _async_notify(self, contexts, everyone=True):
+        """Call the listeners of contexts, and those without one if everyone."""
+        for update_callback, context in list(self._listeners.values()):
+            if (everyone and context is None) or context in contexts:
+                update_callback()
+
+    async def async_power_action(self, action):
+        """Reboot or shut down the device and follow it until it is ready."""
+        send = self.client.reboot_system if action == POWER_REBOOT else self.client.shutdown_system
+        try:
+            if not await send():
+                raise HomeAssistantError(f"{self.client.host} refused to {action}")
+        except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+            # The device may stop before it has answered
+            _LOGGER.debug("No answer to %s from %s: %s", action, self.client.host, err)
+        self.power.start(action)
+        self.breaker.record_success()
+        self._async_notify({"power"}, everyone=False)
+        if self.reschedule is not None:
+            self.reschedule()
+
+    async def _async_reachable(self):
+        try:
+            async with asyncio.timeout(PROBE_TIMEOUT):
+                return await self.client.probe()
+        except asyncio.TimeoutError:
+            return False
+
+    async def _async_follow_power(self):
+        """Probe a device that is rebooting or shutting down.
+
+        Raises UpdateFailed until it has logged in again, after which the
+        refresh goes on to read everything.
+        """
+        power = self.power
+        previous = power.state
+        reachable = await self._async_reachable()
+        authenticated = False
+        if reachable and previous != POWER_GOING_DOWN:
+            # Sessions do not survive a reboot; this read logs in again. The
+            # tracker paces these probes, so logins rejected while the web UI
+            # was starting must not hold back the next one
+            self.client.reset_relogin_backoff()
+            authenticated = await self._async_read_probe()
+        state = power.observe(reachable, authenticated)
+        if state != previous:
+            _LOGGER.info("%s %s: %s", self.client.host, power.action, state)
+            self._async_notify({"power"}, everyone=False)
+
+        if state in (POWER_AUTHENTICATED, POWER_IDLE):
+            # Anything may have changed while the device was away
+            self.invalidate()
+            return
+        if state in (POWER_OFF, POWER_TIMED_OUT):
+            # Leave it to the breaker to notice when the device is back
+            self.breaker.trip()
+        raise UpdateFailed(f"{self.client.host} {power.action}: {state}")
+
+    async def _async_fetch(self, key):
+        """Fetch one endpoint, falling back to its previous value on failure."""
+        # Applied by the client to each attempt once it is past the request
+        # limits, so retries and time spent queued do not eat into it
+        connect, read = self.client.timeout
+        total = max(ENDPOINT_TIMEOUTS.get(key, ENDPOINT_TIMEOUT), connect + read)
+        try:
+            return key, await self.client.fetch(key, total), True
+        except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+            _LOGGER.debug("Fetching %s failed: %s", key, err)
+            return key, (self.data or {}).get(key), False
+
+    async def _async_read_probe(self):
+        """Read PROBE_ENDPOINT afresh and return True if it returned data."""
+        self.client.invalidate(PROBE_ENDPOINT)
+        try:
+            async with asyncio.timeout(PROBE_TIMEOUT):
+                return await self.client.fetch(PROBE_ENDPOINT) is not None
+        except (asyncio.TimeoutError, aiohttp.ClientError) as err:
+            _LOGGER.debug("Probing %s failed: %s", self.client.host, err)
+            return False
+
+    async def _async_probe(self):
+        """Check whether a device that stopped answering is back."""
+        if not await self._async_read_probe():
+            self.breaker.record_failure()
+            raise UpdateFailed(
+                f"{self.client.host} is unreachable, next check in "
+                f"{self.breaker.probe_in():.0f} seconds"
+            )
+        self.breaker.record_success()
+        _LOGGER.info("%s is reachable again", self.client.host)
+        # Anything may have changed while the device was away
+        self.invalidate()
+
+    async def _async_update_data(self):
+        """Fetch the endpoints that are due."""
+        if self.power.active:
+            await self._async_follow_power()
+        elif self.breaker.is_open:
+            await self._async_probe()
+        now = time.monotonic()
+        due = [key for key in ENDPOINT_TIERS if self._is_due(key, now)]
+
+        # The client caps how many of these reach the device at once
+        results = await asyncio.gather(*(self._async_fetch(key) for key in due))
+        triggered = [key for key in WATCH_TRIGGERS if key not in due]
+        if triggered and self._watch_triggered(results):
+            _LOGGER.debug("%s changed, refreshing %s", WATCH_ENDPOINT, triggered)
+            # Cached values predate the change
+            self.client.invalidate(*triggered)
+            results += await asyncio.gather(*(self._async_fetch(key) for key in triggered))
+        self.refresh_duration = time.monotonic() - now
+        if due and not any(ok and value is not None for _, value, ok in results):
+            # Nothing usable came back, e.g. every read was an empty body or
+            # the device rejected the session and the login
+            self.breaker.record_failure()
+            if self.client.login_rejected:
+                raise ConfigEntryAuthFailed(f"{self.client.host} rejected the credentials")
+            raise UpdateFailed(f"No data from {self.client.host}")
+        settled = False
+        if due:
+            self.breaker.record_success()
+            settled = self.power.settle()
+
+        data = dict(self.data or {})
+        read = set()
+        for key, value, ok in results:
+            # None means an error status, an unparsable body or an expired
+            # session; while other endpoints answer, keep the last good
+            # value and retry next time
+            if not ok or value is None:
+                continue
+            self._track_changes(key, data.get(key), value)
+            self._last_fetched[key] = now
+            read.add(key)
+            data[key] = value
+        self._changed = _diff(self.data or {}, data)
+        if settled:
+            self._changed.add("power")
+
+        # Rates and estimates move with every reading, even an unchanged one
+        if "media_status" in read:
+            self.media_progress.update(data["media_status"], now)
+            self._changed.add("media_progress")
+        if "storage_usage" in read:
+            self.forecast.add(data["storage_usage"])
+            self._changed.add("capacity_forecast")
+        return data
+
+
+def _diff(old, new):
+    """Return the endpoints and (endpoint, field) pairs that differ."""
+    changed = set()
+    for key in old.keys() | new.keys():
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            continue
+        changed.add(key)
+        before = before if isinstance(before, dict) else {}
+        after = after if isinstance(after, dict) else {}
+        changed.update(
+            (key, field) for field in before.keys() | after.keys()
+            if before.get(field) != after.get(field)
+        )
+    return changed
@@ -0,0 +1,101 @@
+"""Media crawler progress from successive mediacrawler_status readings."""
+import collections
+import time
+
+# Seconds of readings the indexing rate is averaged over
+RATE_WINDOW = 600
+
+
+class CategoryProgress:
+    """Counts and recent history for one media category."""
+
+    __slots__ = ('total', 'processed', 'history')
+
+    def __init__(self):
+        self.total = None
+        self.processed = None
+        # (monotonic time, processed) readings within RATE_WINDOW
+        self.history = collections.deque()
+
+    def update(self, total, processed, now, window):
+        if self.processed is not None and processed < self.processed:
+            # The crawler started over, e.g. after a rescan or a reboot
+            self.history.clear()
+        self.total = total
+        self.processed = processed
+        self.history.append((now, processed))
+        while len(self.history) > 2 and now - self.history[0][0] > window:
+            self.history.popleft()
+
+    @property
+    def remaining(self):
+        return max(self.total - self.processed, 0)
+
+    @property
+    def rate(self):
+        """Items indexed per minute over the window, or None until two readings"""
+        if len(self.history) < 2:
+            return None
+        (start, first), (end, last) = self.history[0], self.history[-1]
+        if end <= start:
+            return None
+        return (last - first) / (end - start) * 60
+
+    @property
+    def eta(self):
+        """Minutes until the category is indexed, or None if not progressing"""
+        if not self.remaining:
+            return 0
+        rate = self.rate
+        return self.remaining / rate if rate else None
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'processed': self.processed,
+            'remaining': self.remaining,
+            'rate': self.rate,
+            'eta': self.eta,
+        }
+
+
+class CrawlerProgress:
+    """Indexing rate and ETA per category and for the crawler as a whole."""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self.categories = {}
+
+    def update(self, media, now=None):
+        """Record a media_status value; categories without numeric counts are skipped"""
+        now = time.monotonic() if now is None else now
+        for name, counts in (media or {}).get('Media', {}).items():
+            total, processed = counts.get('Total'), counts.get('Processed')
+            if not isinstance(total, int) or not isinstance(processed, int):
+                continue
+            category = self.categories.get(name)
+            if category is None:
+                category = self.categories[name] = CategoryProgress()
+            category.update(total, processed, now, self.window)
+
+    @property
+    def remaining(self):
+        return sum(category.remaining for category in self.categories.values())
+
+    @property
+    def rate(self):
+        """Items indexed per minute across categories, or None until known"""
+        rates = [category.rate for category in self.categories.values()]
+        if not rates or any(rate is None for rate in rates):
+            return None
+        return sum(rates)
+
+    @property
+    def eta(self):
+        """Minutes until every category is indexed, or None if not progressing"""
+        if not self.categories:
+            return None
+        if not self.remaining:
+            return 0
+        rate = self.rate
+        return self.remaining / rate if rate else None
@@ -0,0 +1,41 @@
+"""Diagnostics support for WD MyCloud."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from .const import DOMAIN, ENDPOINT_TIERS, TIER_STATIC
+from .fleet import summarize
+
+TO_REDACT = {CONF_PASSWORD, CONF_USERNAME, "Serial Number", "MAC Address"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    client = coordinator.client
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "options": dict(entry.options),
+        "data": async_redact_data(coordinator.data or {}, TO_REDACT),
+        "refresh_duration": coordinator.refresh_duration,
+        "intervals": {
+            key: coordinator.interval(key)
+            for key, tier in ENDPOINT_TIERS.items() if tier != TIER_STATIC
+        },
+        "login_generation": client.login_generation,
+        "breaker": coordinator.breaker.as_dict(),
+        "power": coordinator.power.as_dict(),
+        "requests": client.stats.as_dict(),
+        "forecast": coordinator.forecast.as_dict(),
+        "fleet": _fleet_summary(hass),
+    }
+
+
+def _fleet_summary(hass: HomeAssistant) -> dict:
+    """Return totals across every loaded entry."""
+    snapshots = {}
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        coordinator = hass.data[DOMAIN].get(entry.entry_id)
+        if coordinator is not None:
+            snapshots[entry.title] = coordinator.data or {}
+    return summarize(snapshots)
@@ -0,0 +1,226 @@
+"""Polling and aggregation across many MyCloud devices."""
+import asyncio
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Requests allowed in flight at once across all devices
+FLEET_MAX_CONCURRENT = 8
+
+# Upper bound on how long the scheduler sleeps, so newly added devices and
+# changed intervals are picked up promptly
+FLEET_TICK = 5
+
+# Consecutive failed polls after which a device is treated as down
+BREAKER_THRESHOLD = 3
+
+# Seconds before the first probe of a device that is down; doubled after
+# every probe that fails, up to BREAKER_PROBE_MAX
+BREAKER_PROBE_MIN = 15
+BREAKER_PROBE_MAX = 600
+
+# Order of the health words system_state reports, from best to worst
+HEALTH_RANK = {'good': 0, 'normal': 0, 'warning': 1, 'high': 1, 'bad': 2, 'critical': 2}
+
+
+class _Member:
+    __slots__ = ('refresh', 'interval', 'next_due', 'task')
+
+    def __init__(self, refresh, interval):
+        self.refresh = refresh
+        self.interval = interval
+        self.next_due = 0
+        self.task = None
+
+
+class CircuitBreaker:
+    """Stop polling a device that keeps failing and probe it on a backoff.
+
+    The breaker opens after threshold failures in a row. While it is open
+    the owner sends one cheap probe each time probe_in() reaches zero;
+    record_failure() doubles the wait and record_success() closes it.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, probe_min=BREAKER_PROBE_MIN,
+                 probe_max=BREAKER_PROBE_MAX):
+        self.threshold = threshold
+        self.probe_min = probe_min
+        self.probe_max = probe_max
+        self.failures = 0
+        # Monotonic time the breaker opened, None while closed
+        self.opened = None
+        self.next_probe = None
+        self._delay = probe_min
+
+    @property
+    def is_open(self):
+        return self.opened is not None
+
+    def probe_in(self, now=None):
+        """Seconds until the next probe is due; 0 while closed"""
+        if not self.is_open:
+            return 0
+        now = time.monotonic() if now is None else now
+        return max(self.next_probe - now, 0)
+
+    def trip(self, now=None):
+        """Open the breaker now, e.g. when the device is known to be going down"""
+        now = time.monotonic() if now is None else now
+        if self.opened is None:
+            self.opened = now
+            self._delay = self.probe_min
+        self.next_probe = now + self._delay
+
+    def record_failure(self, now=None):
+        self.failures += 1
+        if self.is_open:
+            self._delay = min(self._delay * 2, self.probe_max)
+            self.trip(now)
+        elif self.failures >= self.threshold:
+            self.trip(now)
+
+    def record_success(self):
+        self.failures = 0
+        self.opened = self.next_probe = None
+        self._delay = self.probe_min
+
+    def as_dict(self):
+        return {
+            'open': self.is_open,
+            'failures': self.failures,
+            'probe_in': self.probe_in() if self.is_open else None,
+        }
+
+
+class FleetScheduler:
+    """One polling loop for every device instead of one timer per device.
+
+    refresh is an async callable that polls one device and interval a
+    callable returning that device's current poll interval in seconds. It
+    is asked again after every poll, so a device can stretch or shorten its
+    next poll based on what it just saw. Devices are staggered evenly over
+    their interval so they never all hit the network at once, and budget
+    caps requests in flight across the whole fleet.
+    """
+
+    def __init__(self, max_concurrent=FLEET_MAX_CONCURRENT, tick=FLEET_TICK):
+        self.budget = asyncio.Semaphore(max_concurrent)
+        self.tick = tick
+        self._members = {}
+        self._wakeup = asyncio.Event()
+        # Task running run(), managed by whoever starts the scheduler
+        self.task = None
+
+    def __len__(self):
+        return len(self._members)
+
+    def add(self, name, refresh, interval):
+        """Register a device and re-spread every device's next poll"""
+        self._members[name] = _Member(refresh, interval)
+        self._stagger()
+        self._wakeup.set()
+
+    def reschedule(self, name):
+        """Ask a device for its interval again, e.g. after it changed outside a poll"""
+        member = self._members.get(name)
+        if member is not None and member.task is None:
+            member.next_due = time.monotonic() + member.interval()
+            self._wakeup.set()
+
+    def remove(self, name):
+        """Stop polling a device, cancelling a poll in progress"""
+        member = self._members.pop(name, None)
+        if member is not None and member.task is not None:
+            member.task.cancel()
+
+    def _stagger(self):
+        now = time.monotonic()
+        count = len(self._members)
+        for index, member in enumerate(self._members.values()):
+            member.next_due = now + member.interval() * (index + 1) / count
+
+    async def _poll(self, name, member):
+        try:
+            await member.refresh()
+        except Exception:  # A failing device must not stop the fleet
+            _LOGGER.exception("Polling %s failed", name)
+        finally:
+            member.task = None
+            member.next_due = time.monotonic() + member.interval()
+            self._wakeup.set()
+
+    async def run(self):
+        """Poll devices as they come due until cancelled"""
+        try:
+            while True:
+                now = time.monotonic()
+                for name, member in list(self._members.items()):
+                    if member.next_due <= now and member.task is None:
+                        member.next_due = now + member.interval()
+                        member.task = asyncio.ensure_future(self._poll(name, member))
+                soonest = min(
+                    (member.next_due for member in self._members.values()),
+                    default=now + self.tick,
+                )
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), max(0, min(self.tick, soonest - now))
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for member in self._members.values():
+                if member.task is not None:
+                    member.task.cancel()
+
+
+def health_rank(value):
+    """Order a temperature reading, numeric or a health word, from best to worst"""
+    if isinstance(value, (int, float)):
+        return value
+    return HEALTH_RANK.get(str(value).lower(), 0)
+
+
+def summarize(snapshots):
+    """Aggregate per-device snapshots into fleet totals.
+
+    snapshots maps a device name to a dict holding its system_state and
+    storage_usage, as kept in coordinator data or fetched by the CLI.
+    Devices that failed or returned nothing are listed as unreachable.
+    """
+    summary = {
+        'Devices': len(snapshots),
+        'Total Size': 0,
+        'Used Space': 0,
+        'Free Space': 0,
+        'Worst Temperature': None,
+        'Hottest Device': None,
+        'SMART Failed': [],
+        'Unreachable': [],
+    }
+    worst = None
+
+    for name, data in snapshots.items():
+        if not isinstance(data, dict) or not any(data.values()):
+            summary['Unreachable'].append(name)
+            continue
+
+        usage = data.get('storage_usage') or {}
+        if usage.get('Total Size') is not None and usage.get('Used Space') is not None:
+            summary['Total Size'] += usage['Total Size']
+            summary['Used Space'] += usage['Used Space']
+            summary['Free Space'] += usage['Total Size'] - usage['Used Space']
+
+        state = data.get('system_state') or {}
+        temperature = state.get('Temperature')
+        if temperature is not None and (worst is None or health_rank(temperature) > worst):
+            worst = health_rank(temperature)
+            summary['Worst Temperature'] = temperature
+            summary['Hottest Device'] = name
+        smart = state.get('SMART')
+        if smart is not None and str(smart).lower() != 'good':
+            summary['SMART Failed'].append(name)
+
+    return summary
@@ -0,0 +1,187 @@
+"""Storage fill-rate trends and days-until-full forecasts."""
+import math
+import time
+
+# Days after which a sample weighs half as much as a new one
+FORECAST_HALF_LIFE = 30
+
+# Days of samples needed before a trend is reported
+FORECAST_MIN_SPAN = 1
+
+# Residuals beyond this many standard deviations are down-weighted
+HUBER_K = 2
+
+# Smallest residual spread assumed, as a fraction of the level, so a
+# series that has not moved yet does not treat every change as an outlier
+HUBER_FLOOR = 0.005
+
+# Consecutive outliers on the same side of the line that confirm a lasting
+# change rather than a one-off
+FORECAST_CONFIRM_AFTER = 12
+
+# storage_usage fields fitted, with the series names HistoryStore uses
+CATEGORIES = {
+    'Used Space': 'used_space',
+    'Video': 'video',
+    'Photos': 'photos',
+    'Music': 'music',
+    'Other': 'other',
+}
+
+DAY = 86400
+
+
+class TrendFit:
+    """Exponentially weighted linear fit of value against time in days."""
+
+    __slots__ = ('weight', 'mean_t', 'mean_y', 'c_tt', 'c_ty', 'c_yy',
+                 'first', 'last', 'decay', 'outliers')
+
+    def __init__(self, half_life=FORECAST_HALF_LIFE):
+        self.decay = math.log(2) / half_life
+        self.weight = 0.0
+        self.mean_t = self.mean_y = 0.0
+        self.c_tt = self.c_ty = self.c_yy = 0.0
+        self.first = self.last = None
+        # Residuals of the latest run of outliers on the same side of the line
+        self.outliers = []
+
+    @property
+    def slope(self):
+        """Change per day, or None until the samples span FORECAST_MIN_SPAN"""
+        if self.first is None or self.last - self.first < FORECAST_MIN_SPAN or self.c_tt <= 0:
+            return None
+        return self.c_ty / self.c_tt
+
+    def predict(self, t):
+        slope = self.slope
+        return None if slope is None else self.mean_y + slope * (t - self.mean_t)
+
+    def _spread(self):
+        if self.c_tt <= 0:
+            return 0.0
+        variance = max(self.c_yy - self.c_ty ** 2 / self.c_tt, 0.0) / self.weight
+        return math.sqrt(variance)
+
+    def _weight(self, t, y):
+        """Huber weight of a sample, tracking runs of outliers"""
+        predicted = self.predict(t)
+        if predicted is None:
+            return 1.0
+        scale = HUBER_K * max(self._spread(), HUBER_FLOOR * abs(self.mean_y))
+        residual = y - predicted
+        if scale <= 0 or abs(residual) <= scale:
+            self.outliers = []
+            return 1.0
+        if self.outliers and (self.outliers[-1] > 0) != (residual > 0):
+            self.outliers = []
+        self.outliers.append(residual)
+        return scale / abs(residual)
+
+    def add(self, t, y):
+        """Add a sample at t days; samples older than the last are ignored"""
+        if self.last is not None and t < self.last:
+            return
+        weight = self._weight(t, y)
+        if len(self.outliers) >= FORECAST_CONFIRM_AFTER:
+            # Space was copied in or freed: move the line to the new level
+            # and keep its slope; co-moments about the mean do not change
+            # with the level
+            self.mean_y += sum(self.outliers) / len(self.outliers)
+            self.outliers = []
+            weight = 1.0
+        self._update(t, y, weight)
+
+    def _update(self, t, y, weight):
+        if self.first is None:
+            self.first = t
+        elif t > self.last:
+            fade = math.exp(-self.decay * (t - self.last))
+            self.weight *= fade
+            self.c_tt *= fade
+            self.c_ty *= fade
+            self.c_yy *= fade
+        self.last = t
+
+        # Weighted incremental update of means and co-moments (West, 1979)
+        total = self.weight + weight
+        dt = t - self.mean_t
+        dy = y - self.mean_y
+        self.mean_t += weight * dt / total
+        self.mean_y += weight * dy / total
+        self.c_tt += weight * dt * (t - self.mean_t)
+        self.c_ty += weight * dt * (y - self.mean_y)
+        self.c_yy += weight * dy * (y - self.mean_y)
+        self.weight = total
+
+
+class CapacityForecast:
+    """Fill rate per storage_usage category and when the volume runs out."""
+
+    def __init__(self, half_life=FORECAST_HALF_LIFE):
+        self.fits = {key: TrendFit(half_life) for key in CATEGORIES}
+        self.total_size = None
+        self.used_space = None
+        self.updated = None
+
+    def add(self, usage, timestamp=None):
+        """Add a storage_usage value read at timestamp (epoch seconds)"""
+        if not isinstance(usage, dict):
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        for key, fit in self.fits.items():
+            if isinstance(usage.get(key), (int, float)):
+                fit.add(timestamp / DAY, usage[key])
+        if isinstance(usage.get('Total Size'), (int, float)):
+            self.total_size = usage['Total Size']
+        if isinstance(usage.get('Used Space'), (int, float)):
+            self.used_space = usage['Used Space']
+        self.updated = timestamp
+
+    def seed(self, history):
+        """Fit the readings kept in a HistoryStore, oldest first"""
+        rows = []
+        for key, series in CATEGORIES.items():
+            # Daily buckets reach further back; hourly ones fill in recent detail
+            hourly = history.query(series, 3600)
+            since = hourly[0]['start'] if hourly else math.inf
+            daily = [row for row in history.query(series, 86400) if row['start'] + DAY <= since]
+            rows.extend((row['start'], key, row['mean']) for row in daily + hourly)
+        total = history.query('total_size', 3600) or history.query('total_size', 86400)
+        if total:
+            self.total_size = total[-1]['mean']
+        for start, key, value in sorted(rows):
+            self.fits[key].add(start / DAY, value)
+            if key == 'Used Space':
+                self.used_space = value
+                self.updated = start
+
+    def rate(self, key='Used Space'):
+        """Bytes per day a category grows by, or None while unknown"""
+        return self.fits[key].slope
+
+    @property
+    def days_until_full(self):
+        """Days until used space reaches the volume size at the current trend.
+
+        None while the trend is unknown or usage is not growing.
+        """
+        rate = self.rate()
+        if rate is None or rate <= 0 or self.total_size is None or self.used_space is None:
+            return None
+        return max(self.total_size - self.used_space, 0) / rate
+
+    @property
+    def full_date(self):
+        """Epoch seconds when the volume is expected to be full, or None"""
+        days = self.days_until_full
+        if days is None or self.updated is None:
+            return None
+        return self.updated + days * DAY
+
+    def as_dict(self):
+        return {
+            'days_until_full': self.days_until_full,
+            'full_date': self.full_date,
+            'rates': {key: self.rate(key) for key in self.fits},
+        }
@@ -0,0 +1,252 @@
+"""Compact on-disk history of NAS readings, downsampled into buckets."""
+import array
+import bisect
+import os
+import re
+import struct
+import threading
+import time
+
+# (bucket seconds, retention seconds), finest first
+RESOLUTIONS = (
+    (300, 2 * 86400),
+    (3600, 90 * 86400),
+    (86400, 5 * 365 * 86400),
+)
+
+# Bucket start, sample count, mean, min, max; a bucket still filling is
+# appended again and the newest copy wins when the file is loaded
+RECORD = struct.Struct('<IIddd')
+
+# Series recorded from each ENDPOINTS value
+SERIES_FIELDS = {
+    'system_state': {'Temperature': 'temperature'},
+    'storage_usage': {
+        'Total Size': 'total_size',
+        'Used Space': 'used_space',
+        'Video': 'video',
+        'Photos': 'photos',
+        'Music': 'music',
+        'Other': 'other',
+    },
+}
+
+
+def safe_name(name):
+    """Return name usable as a file name"""
+    return re.sub(r'[^\w.-]+', '_', name).strip('._') or '_'
+
+
+def samples(name, value):
+    """Yield (series, number) pairs worth keeping from an endpoint value"""
+    if not isinstance(value, dict):
+        return
+    for key, series in SERIES_FIELDS.get(name, {}).items():
+        reading = value.get(key)
+        if isinstance(reading, (int, float)) and not isinstance(reading, bool):
+            yield series, reading
+    if name == 'media_status':
+        for category, counts in (value.get('Media') or {}).items():
+            for key in ('Processed', 'Total'):
+                if isinstance(counts.get(key), int):
+                    yield safe_name(f'media.{category}.{key.lower()}'), counts[key]
+
+
+class _Track:
+    """Buckets of one series at one resolution"""
+
+    __slots__ = ('resolution', 'retention', 'starts', 'counts', 'means', 'mins',
+                 'maxs', 'flushed', 'garbage')
+
+    def __init__(self, resolution, retention):
+        self.resolution = resolution
+        self.retention = retention
+        self.starts = array.array('I')
+        self.counts = array.array('I')
+        self.means = array.array('d')
+        self.mins = array.array('d')
+        self.maxs = array.array('d')
+        # Records before this index are on disk in their final form
+        self.flushed = 0
+        # Records in the file that are superseded or expired
+        self.garbage = 0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _append(self, start, count, mean, low, high):
+        self.starts.append(start)
+        self.counts.append(count)
+        self.means.append(mean)
+        self.mins.append(low)
+        self.maxs.append(high)
+
+    def load(self, data):
+        for start, count, mean, low, high in RECORD.iter_unpack(data):
+            if self.starts and start <= self.starts[-1]:
+                # A newer copy of a bucket that was still filling
+                self.garbage += 1
+                self._truncate(bisect.bisect_left(self.starts, start))
+            self._append(start, count, mean, low, high)
+        self.flushed = len(self)
+
+    def _truncate(self, index):
+        for column in (self.starts, self.counts, self.means, self.mins, self.maxs):
+            del column[index:]
+
+    def add(self, value, timestamp):
+        start = int(timestamp) - int(timestamp) % self.resolution
+        if self.starts and start < self.starts[-1]:
+            return  # Clock went backwards; keep the history ordered
+        if self.starts and start == self.starts[-1]:
+            count = self.counts[-1]
+            self.means[-1] = (self.means[-1] * count + value) / (count + 1)
+            self.counts[-1] = count + 1
+            self.mins[-1] = min(self.mins[-1], value)
+            self.maxs[-1] = max(self.maxs[-1], value)
+            if self.flushed == len(self):
+                # The bucket was saved before this sample; save it again
+                self.flushed -= 1
+                self.garbage += 1
+        else:
+            self._append(start, 1, value, value, value)
+
+    def expire(self, now):
+        index = bisect.bisect_left(self.starts, int(now - self.retention))
+        if index:
+            for column in (self.starts, self.counts, self.means, self.mins, self.maxs):
+                del column[:index]
+            self.flushed = max(self.flushed - index, 0)
+            self.garbage += index
+
+    def pack(self, begin=0):
+        return b''.join(
+            RECORD.pack(self.starts[i], self.counts[i], self.means[i], self.mins[i], self.maxs[i])
+            for i in range(begin, len(self))
+        )
+
+    def rows(self, start, end):
+        # Include the bucket that start falls in
+        begin = (
+            bisect.bisect_right(self.starts, int(start) - self.resolution)
+            if start is not None else 0
+        )
+        stop = bisect.bisect_right(self.starts, int(end)) if end is not None else len(self)
+        return [
+            {
+                'start': self.starts[i],
+                'count': self.counts[i],
+                'mean': self.means[i],
+                'min': self.mins[i],
+                'max': self.maxs[i],
+            }
+            for i in range(begin, stop)
+        ]
+
+
+class HistoryStore:
+    """Downsampled series for one device, kept in the directory path.
+
+    add and query are cheap and safe to call from an event loop; load and
+    flush do file I/O and belong in a worker thread. Samples only reach the
+    disk on flush.
+    """
+
+    def __init__(self, path, resolutions=RESOLUTIONS):
+        self.path = path
+        self.resolutions = resolutions
+        self._tracks = {}
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+
+    def _file(self, series, resolution):
+        return os.path.join(self.path, f'{series}.{resolution}')
+
+    def _track(self, series, resolution, retention):
+        key = (series, resolution)
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = _Track(resolution, retention)
+        return track
+
+    def load(self):
+        """Read the saved history"""
+        if not os.path.isdir(self.path):
+            return
+        retention = dict(self.resolutions)
+        with self._lock:
+            for filename in os.listdir(self.path):
+                series, _, resolution = filename.rpartition('.')
+                if not resolution.isdigit() or int(resolution) not in retention:
+                    continue
+                with open(os.path.join(self.path, filename), 'rb') as history:
+                    data = history.read()
+                # Drop a record cut short by a crash while it was appended
+                data = data[:len(data) - len(data) % RECORD.size]
+                track = self._track(series, int(resolution), retention[int(resolution)])
+                track.load(data)
+                track.expire(time.time())
+
+    @property
+    def series(self):
+        """Names of the series held"""
+        return sorted({series for series, _ in self._tracks})
+
+    def add(self, series, value, timestamp=None):
+        """Add one reading to every resolution of a series"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for resolution, retention in self.resolutions:
+                track = self._track(series, resolution, retention)
+                track.add(float(value), timestamp)
+
+    def record(self, name, value, timestamp=None):
+        """Add the readings found in an ENDPOINTS value"""
+        for series, reading in samples(name, value):
+            self.add(series, reading, timestamp)
+
+    def query(self, series, resolution=None, start=None, end=None):
+        """Return the buckets of series between start and end (epoch seconds).
+
+        Without a resolution the finest one still covering start is used.
+        """
+        if resolution is None:
+            age = time.time() - start if start is not None else 0
+            resolution = next(
+                (res for res, retention in self.resolutions if retention >= age),
+                self.resolutions[-1][0],
+            )
+        with self._lock:
+            track = self._tracks.get((series, resolution))
+            return track.rows(start, end) if track is not None else []
+
+    def flush(self):
+        """Save new and updated buckets, compacting files that are mostly stale"""
+        now = time.time()
+        writes = []
+        # Held across the snapshot and the writes so concurrent flushes
+        # append in the order their snapshots were taken
+        with self._io_lock:
+            with self._lock:
+                for (series, resolution), track in self._tracks.items():
+                    track.expire(now)
+                    if track.garbage > max(len(track), 64):
+                        writes.append((self._file(series, resolution), 'wb', track.pack()))
+                        track.garbage = 0
+                    elif track.flushed < len(track):
+                        writes.append((self._file(series, resolution), 'ab', track.pack(track.flushed)))
+                    else:
+                        continue
+                    track.flushed = len(track)
+            if not writes:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            for filename, mode, data in writes:
+                if mode == 'wb':
+                    # Replace atomically so a crash never leaves a truncated history
+                    with open(filename + '.tmp', 'wb') as history:
+                        history.write(data)
+                    os.replace(filename + '.tmp', filename)
+                else:
+                    with open(filename, 'ab') as history:
+                        history.write(data)
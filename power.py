@@ -0,0 +1,121 @@
+"""Following a NAS through a reboot or shutdown until it is ready again."""
+import time
+
+POWER_REBOOT = 'reboot'
+POWER_SHUTDOWN = 'shutdown'
+
+# Nothing in progress; the device is polled as usual
+POWER_IDLE = 'idle'
+# The action was sent and the web server still answers
+POWER_GOING_DOWN = 'going_down'
+# The web server stopped answering
+POWER_UNREACHABLE = 'unreachable'
+# The web server answers again but login does not work yet
+POWER_STARTING = 'starting'
+# Logged in again; the next full refresh completes the action
+POWER_AUTHENTICATED = 'authenticated'
+# A shutdown finished; shown until the device is seen again
+POWER_OFF = 'off'
+# The device did not come back within POWER_TIMEOUT
+POWER_TIMED_OUT = 'timed_out'
+
+POWER_STATES = (
+    POWER_IDLE, POWER_GOING_DOWN, POWER_UNREACHABLE, POWER_STARTING,
+    POWER_AUTHENTICATED, POWER_OFF, POWER_TIMED_OUT,
+)
+POWER_ACTIVE = (POWER_GOING_DOWN, POWER_UNREACHABLE, POWER_STARTING, POWER_AUTHENTICATED)
+
+# Seconds between probes: POWER_PROBE_MIN after every change of state,
+# growing by half with each probe that sees none, up to POWER_PROBE_MAX
+POWER_PROBE_MIN = 5
+POWER_PROBE_MAX = 30
+
+# Seconds the device may keep answering before the action counts as ignored
+POWER_DOWN_GRACE = 180
+
+# Seconds after the action at which following it is given up
+POWER_TIMEOUT = 900
+
+
+class PowerTracker:
+    """State of the last reboot or shutdown sent to a device."""
+
+    def __init__(self):
+        self.state = POWER_IDLE
+        self.action = None
+        # Monotonic times the action was sent and the state last changed
+        self.started = None
+        self.changed = None
+        self.next_probe = None
+        self._delay = POWER_PROBE_MIN
+
+    @property
+    def active(self):
+        """Return True while the device is being followed instead of polled"""
+        return self.state in POWER_ACTIVE
+
+    def _set(self, state, now):
+        if state != self.state:
+            self.state = state
+            self.changed = now
+            self._delay = POWER_PROBE_MIN
+
+    def start(self, action, now=None):
+        """Start following a device that was just told to reboot or shut down"""
+        now = time.monotonic() if now is None else now
+        self.action = action
+        self.started = now
+        self.state = None
+        self._set(POWER_GOING_DOWN, now)
+        self.next_probe = now + self._delay
+
+    def probe_in(self, now=None):
+        """Seconds until the next probe is due; 0 while nothing is followed"""
+        if not self.active:
+            return 0
+        now = time.monotonic() if now is None else now
+        return max(self.next_probe - now, 0)
+
+    def observe(self, reachable, authenticated=False, now=None):
+        """Advance with the result of a probe and return the new state.
+
+        reachable is whether the web server answered at all and
+        authenticated whether a login-protected read succeeded.
+        """
+        now = time.monotonic() if now is None else now
+        previous = self.state
+        if self.state == POWER_GOING_DOWN:
+            if not reachable:
+                self._set(POWER_OFF if self.action == POWER_SHUTDOWN else POWER_UNREACHABLE, now)
+            elif now - self.started > POWER_DOWN_GRACE:
+                self._set(POWER_IDLE, now)
+        elif self.state == POWER_STARTING and not reachable:
+            self._set(POWER_UNREACHABLE, now)
+        if self.state == POWER_UNREACHABLE and reachable:
+            self._set(POWER_STARTING, now)
+        if self.state == POWER_STARTING and authenticated:
+            self._set(POWER_AUTHENTICATED, now)
+        if self.active and now - self.started > POWER_TIMEOUT:
+            self._set(POWER_TIMED_OUT, now)
+
+        if self.active:
+            if self.state == previous:
+                self._delay = min(self._delay * 1.5, POWER_PROBE_MAX)
+            self.next_probe = now + self._delay
+        return self.state
+
+    def settle(self, now=None):
+        """Record that the device was polled successfully; return True if the state changed"""
+        if self.state == POWER_IDLE:
+            return False
+        self._set(POWER_IDLE, time.monotonic() if now is None else now)
+        return True
+
+    def as_dict(self, now=None):
+        now = time.monotonic() if now is None else now
+        return {
+            'state': self.state,
+            'action': self.action,
+            'elapsed': None if self.started is None else now - self.started,
+            'probe_in': self.probe_in(now) if self.active else None,
+        }
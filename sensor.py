@@ -1,15 +1,13 @@
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTemperature, UnitOfTime
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, CoordinatorEntity
-import logging
-from datetime import timedelta
-from .const import DOMAIN, SCAN_INTERVAL
-
-_LOGGER = logging.getLogger(__name__)
-
-SCAN_INTERVAL = timedelta(seconds=60)  # Ändra till timedelta-objekt
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+from .const import DOMAIN, ENDPOINT_TIERS
+from .power import POWER_STATES
+from .wdmycloud import ENDPOINTS
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -17,32 +15,7 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the WD MyCloud sensors."""
-    client = hass.data[DOMAIN][config_entry.entry_id]
-
-    # Get scan interval from options and convert to timedelta
-    scan_interval_seconds = config_entry.options.get("scan_interval", SCAN_INTERVAL.total_seconds())
-    update_interval = timedelta(seconds=scan_interval_seconds)
-
-    async def async_update_data():
-        """Fetch data from API."""
-        data = {}
-        data["system_info"] = await hass.async_add_executor_job(client.get_system_info)
-        data["system_state"] = await hass.async_add_executor_job(client.get_system_state)
-        data["storage_usage"] = await hass.async_add_executor_job(client.get_storage_usage)
-        data["media_status"] = await hass.async_add_executor_job(client.get_media_status)
-        data["firmware_info"] = await hass.async_add_executor_job(client.get_firmware_info)
-        return data
-
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name="wd_mycloud",
-        update_method=async_update_data,
-        update_interval=update_interval,
-    )
-
-    # Fetch initial data
-    await coordinator.async_config_entry_first_refresh()
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
     entities = []
     
@@ -67,7 +40,7 @@ async def async_setup_entry(
         ))
 
     # System state sensors
-    for key in ["Status", "Temperature", "SMART", "Overall"]:
+    for key in ["Status", "SMART", "Overall"]:
         entities.append(WDMyCloudSensor(
             coordinator, 
             config_entry.entry_id,
@@ -76,6 +49,28 @@ async def async_setup_entry(
             "system_state"
         ))
 
+    # Most firmware reports a health word such as "good" rather than degrees;
+    # only expose a numeric temperature sensor when the device sends numbers
+    temperature = ((coordinator.data or {}).get("system_state") or {}).get("Temperature")
+    if isinstance(temperature, (int, float)):
+        entities.append(WDMyCloudSensor(
+            coordinator,
+            config_entry.entry_id,
+            "system_state",
+            "Temperature",
+            SensorDeviceClass.TEMPERATURE,
+            unit=UnitOfTemperature.CELSIUS,
+            state_class=SensorStateClass.MEASUREMENT,
+        ))
+    else:
+        entities.append(WDMyCloudSensor(
+            coordinator,
+            config_entry.entry_id,
+            "system_state",
+            "Temperature",
+            "system_state"
+        ))
+
     # Storage usage sensors
     for key in ["Total Size", "Used Space", "Video", "Photos", "Music"]:
         entities.append(WDMyCloudSensor(
@@ -83,7 +78,32 @@ async def async_setup_entry(
             config_entry.entry_id,
             "storage_usage",
             key,
-            "storage"
+            SensorDeviceClass.DATA_SIZE,
+            unit=UnitOfInformation.BYTES,
+            suggested_unit=UnitOfInformation.GIGABYTES,
+            state_class=SensorStateClass.MEASUREMENT,
+        ))
+
+    # Media crawler progress, per category found at startup and overall
+    media = ((coordinator.data or {}).get("media_status") or {}).get("Media") or {}
+    for category in media:
+        entities.append(WDMyCloudMediaSensor(coordinator, config_entry.entry_id, category))
+    entities.append(WDMyCloudMediaRateSensor(coordinator, config_entry.entry_id))
+    entities.append(WDMyCloudMediaEtaSensor(coordinator, config_entry.entry_id))
+
+    # Capacity forecast from the storage usage trend
+    entities.append(WDMyCloudFillRateSensor(coordinator, config_entry.entry_id))
+    entities.append(WDMyCloudDaysUntilFullSensor(coordinator, config_entry.entry_id))
+
+    # Progress of a reboot or shutdown
+    entities.append(WDMyCloudPowerSensor(coordinator, config_entry.entry_id))
+
+    # Request diagnostics from the client's RequestStats
+    entities.append(WDMyCloudRefreshDurationSensor(coordinator, config_entry.entry_id))
+    entities.append(WDMyCloudRequestErrorsSensor(coordinator, config_entry.entry_id))
+    for key in ENDPOINT_TIERS:
+        entities.append(WDMyCloudLatencySensor(
+            coordinator, config_entry.entry_id, ENDPOINTS[key].path
         ))
 
     async_add_entities(entities)
@@ -92,20 +112,24 @@ async def async_setup_entry(
 class WDMyCloudSensor(CoordinatorEntity, SensorEntity):
     """Representation of a WD MyCloud sensor."""
 
-    def __init__(self, coordinator, entry_id, data_type, key, device_class):
+    def __init__(self, coordinator, entry_id, data_type, key, device_class,
+                 unit=None, suggested_unit=None, state_class=None):
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=(data_type, key))
         self._entry_id = entry_id
         self._data_type = data_type
         self._key = key
         self._attr_name = f"WD MyCloud {key}"
         self._attr_unique_id = f"{entry_id}_{data_type}_{key}".lower()
         self._attr_device_class = device_class
+        self._attr_native_unit_of_measurement = unit
+        self._attr_suggested_unit_of_measurement = suggested_unit
+        self._attr_state_class = state_class
 
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        if self.coordinator.data and self._data_type in self.coordinator.data:
+        if self.coordinator.data and self.coordinator.data.get(self._data_type):
             return self.coordinator.data[self._data_type].get(self._key)
         return None
 
@@ -117,3 +141,252 @@ class WDMyCloudSensor(CoordinatorEntity, SensorEntity):
             "name": "WD MyCloud",
             "manufacturer": "Western Digital",
         }
+
+
+class WDMyCloudMediaSensor(WDMyCloudSensor):
+    """Items the media crawler has indexed in one category."""
+
+    def __init__(self, coordinator, entry_id, category):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry_id, "media_status", category, None,
+            unit="items",
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+        self.coordinator_context = "media_progress"
+        self._attr_name = f"WD MyCloud Media {category.title()} Indexed"
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        progress = self.coordinator.media_progress.categories.get(self._key)
+        return None if progress is None else progress.processed
+
+    @property
+    def extra_state_attributes(self):
+        """Return the total, rate and ETA for the category."""
+        progress = self.coordinator.media_progress.categories.get(self._key)
+        return None if progress is None else progress.as_dict()
+
+
+class WDMyCloudMediaRateSensor(WDMyCloudSensor):
+    """Items indexed per minute across all media categories."""
+
+    def __init__(self, coordinator, entry_id):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry_id, "media_status", "Media Indexing Rate", None,
+            unit="items/min",
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+        self.coordinator_context = "media_progress"
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        rate = self.coordinator.media_progress.rate
+        return None if rate is None else round(rate, 1)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the crawler state and items left to index."""
+        return {
+            "crawler_active": self.coordinator.crawler_active,
+            "remaining": self.coordinator.media_progress.remaining,
+        }
+
+
+class WDMyCloudMediaEtaSensor(WDMyCloudSensor):
+    """Minutes until the media crawler has indexed everything."""
+
+    def __init__(self, coordinator, entry_id):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry_id, "media_status", "Media Indexing ETA",
+            SensorDeviceClass.DURATION,
+            unit=UnitOfTime.MINUTES,
+        )
+        self.coordinator_context = "media_progress"
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        eta = self.coordinator.media_progress.eta
+        return None if eta is None else round(eta, 1)
+
+
+class WDMyCloudFillRateSensor(WDMyCloudSensor):
+    """Growth of used space per day, from the storage usage trend."""
+
+    def __init__(self, coordinator, entry_id):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry_id, "forecast", "Storage Fill Rate", None,
+            unit="GB/d",
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+        self.coordinator_context = "capacity_forecast"
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        rate = self.coordinator.forecast.rate()
+        return None if rate is None else round(rate / 1e9, 2)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the fill rate of each category in GB per day."""
+        forecast = self.coordinator.forecast
+        return {
+            key: None if forecast.rate(key) is None else round(forecast.rate(key) / 1e9, 2)
+            for key in forecast.fits if key != "Used Space"
+        }
+
+
+class WDMyCloudDaysUntilFullSensor(WDMyCloudSensor):
+    """Days until the volume is full at the current fill rate."""
+
+    def __init__(self, coordinator, entry_id):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry_id, "forecast", "Days Until Full",
+            SensorDeviceClass.DURATION,
+            unit=UnitOfTime.DAYS,
+        )
+        self.coordinator_context = "capacity_forecast"
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        days = self.coordinator.forecast.days_until_full
+        return None if days is None else round(days, 1)
+
+    @property
+    def extra_state_attributes(self):
+        """Return when the volume is expected to be full."""
+        full_date = self.coordinator.forecast.full_date
+        if full_date is None:
+            return None
+        return {"full_date": dt_util.utc_from_timestamp(full_date).isoformat()}
+
+
+class WDMyCloudPowerSensor(WDMyCloudSensor):
+    """Where the device is in a reboot or shutdown."""
+
+    def __init__(self, coordinator, entry_id):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry_id, "power", "Power State", SensorDeviceClass.ENUM,
+        )
+        self._attr_options = list(POWER_STATES)
+        self.coordinator_context = "power"
+
+    @property
+    def available(self):
+        """Stay available while the rest of the device is not."""
+        return True
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        return self.coordinator.power.state
+
+    @property
+    def extra_state_attributes(self):
+        """Return the action followed and the seconds since it was sent."""
+        power = self.coordinator.power.as_dict()
+        elapsed = power["elapsed"]
+        return {"action": power["action"], "elapsed": None if elapsed is None else round(elapsed)}
+
+
+class WDMyCloudRefreshDurationSensor(WDMyCloudSensor):
+    """Time the last coordinator refresh took."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, entry_id):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry_id, "diagnostics", "Refresh Duration",
+            SensorDeviceClass.DURATION,
+            unit=UnitOfTime.SECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+        # Request stats move on every refresh, whatever the data did
+        self.coordinator_context = None
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        duration = self.coordinator.refresh_duration
+        return None if duration is None else round(duration, 3)
+
+
+class WDMyCloudRequestErrorsSensor(WDMyCloudSensor):
+    """Failed and timed out requests to the device since startup."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, entry_id):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry_id, "diagnostics", "Request Errors", None,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+        )
+        self.coordinator_context = None
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        endpoints = self.coordinator.client.stats.endpoints.values()
+        return sum(stats.errors + stats.timeouts for stats in endpoints)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the errors and timeouts per endpoint."""
+        return {
+            endpoint: {"errors": stats.errors, "timeouts": stats.timeouts}
+            for endpoint, stats in self.coordinator.client.stats.endpoints.items()
+            if stats.errors or stats.timeouts
+        }
+
+
+class WDMyCloudLatencySensor(WDMyCloudSensor):
+    """Latency of the last request to one REST endpoint."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, entry_id, endpoint):
+        """Initialize the sensor."""
+        super().__init__(
+            coordinator, entry_id, "latency", endpoint,
+            SensorDeviceClass.DURATION,
+            unit=UnitOfTime.MILLISECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+        )
+        self.coordinator_context = None
+        self._attr_name = f"WD MyCloud Latency {endpoint}"
+
+    @property
+    def _stats(self):
+        return self.coordinator.client.stats.endpoints.get(self._key)
+
+    @property
+    def native_value(self):
+        """Return the state of the sensor."""
+        stats = self._stats
+        if stats is None or stats.latency_last is None:
+            return None
+        return round(stats.latency_last * 1000, 1)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the endpoint's request counters."""
+        stats = self._stats
+        if stats is None:
+            return None
+        return {
+            key: value for key, value in stats.as_dict().items()
+            if key not in ("latency_ms_last", "latency_buckets")
+        }
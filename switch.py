@@ -2,6 +2,7 @@ from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from .const import DOMAIN
 
 async def async_setup_entry(
@@ -10,25 +11,25 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the WD MyCloud switches."""
-    client = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
     
     entities = [
-        WDMyCloudLEDSwitch(client, config_entry.entry_id),
-        WDMyCloudHDDStandbySwitch(client, config_entry.entry_id)
+        WDMyCloudLEDSwitch(coordinator, config_entry.entry_id),
+        WDMyCloudHDDStandbySwitch(coordinator, config_entry.entry_id)
     ]
     
     async_add_entities(entities)
 
-class WDMyCloudLEDSwitch(SwitchEntity):
+class WDMyCloudLEDSwitch(CoordinatorEntity, SwitchEntity):
     """Representation of WD MyCloud LED switch."""
 
-    def __init__(self, client, entry_id):
+    def __init__(self, coordinator, entry_id):
         """Initialize the LED switch."""
-        self._client = client
+        super().__init__(coordinator, context="led_status")
+        self._client = coordinator.client
         self._entry_id = entry_id
         self._attr_name = "WD MyCloud LED"
         self._attr_unique_id = f"{entry_id}_led"
-        self._state = None
 
     @property
     def device_info(self):
@@ -39,39 +40,34 @@ class WDMyCloudLEDSwitch(SwitchEntity):
             "manufacturer": "Western Digital",
         }
 
-    async def async_update(self) -> None:
-        """Fetch new state data for the switch."""
-        self._state = await self.hass.async_add_executor_job(
-            self._client.get_led_status
-        )
-
     @property
     def is_on(self) -> bool:
         """Return true if switch is on."""
-        return self._state
+        return (self.coordinator.data or {}).get("led_status")
+
+    async def _async_set(self, enabled) -> None:
+        """Write the LED setting and update state without reading it back."""
+        if await self._client.set_led_status(enabled):
+            self.coordinator.async_set_endpoint_data("led_status", enabled)
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn the switch on."""
-        await self.hass.async_add_executor_job(
-            self._client.set_led_status, True
-        )
+        await self._async_set(True)
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn the switch off."""
-        await self.hass.async_add_executor_job(
-            self._client.set_led_status, False
-        )
+        await self._async_set(False)
 
-class WDMyCloudHDDStandbySwitch(SwitchEntity):
+class WDMyCloudHDDStandbySwitch(CoordinatorEntity, SwitchEntity):
     """Representation of WD MyCloud HDD Standby switch."""
 
-    def __init__(self, client, entry_id):
+    def __init__(self, coordinator, entry_id):
         """Initialize the HDD standby switch."""
-        self._client = client
+        super().__init__(coordinator, context="hdd_standby")
+        self._client = coordinator.client
         self._entry_id = entry_id
         self._attr_name = "WD MyCloud HDD Standby"
         self._attr_unique_id = f"{entry_id}_hdd_standby"
-        self._state = None
 
     @property
     def device_info(self):
@@ -82,27 +78,31 @@ class WDMyCloudHDDStandbySwitch(SwitchEntity):
             "manufacturer": "Western Digital",
         }
 
-    async def async_update(self) -> None:
-        """Fetch new state data for the switch."""
-        standby_info = await self.hass.async_add_executor_job(
-            self._client.get_hdd_standby
-        )
-        if standby_info:
-            self._state = standby_info['enabled']
+    @property
+    def _standby_info(self):
+        return (self.coordinator.data or {}).get("hdd_standby")
 
     @property
     def is_on(self) -> bool:
         """Return true if switch is on."""
-        return self._state
+        standby_info = self._standby_info
+        if standby_info:
+            return standby_info['enabled']
+        return None
+
+    async def _async_set(self, enabled) -> None:
+        """Write the standby setting and update state without reading it back."""
+        # Keep the configured standby time instead of resetting it to the default
+        minutes = (self._standby_info or {}).get('minutes', 10)
+        if await self._client.set_hdd_standby(enabled, minutes):
+            self.coordinator.async_set_endpoint_data(
+                "hdd_standby", {'enabled': enabled, 'minutes': minutes}
+            )
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn the switch on."""
-        await self.hass.async_add_executor_job(
-            self._client.set_hdd_standby, True
-        )
+        await self._async_set(True)
 
     async def async_turn_off(self, **kwargs) -> None:
         """Turn the switch off."""
-        await self.hass.async_add_executor_job(
-            self._client.set_hdd_standby, False
-        )
+        await self._async_set(False)
@@ -0,0 +1,199 @@
+"""End-to-end benchmarks for the MyCloud clients against mock devices.
+
+Measures per-endpoint call latency with the blocking client, the time of
+a full coordinator-style refresh with the asyncio client (sequential and
+concurrent), the CPU cost of parsing each endpoint's response and the
+throughput of a fleet sweep through the CLI. Results can be saved as JSON
+and compared with a previous run:
+
+    python tools/benchmark.py --latency 0.05 --devices 12 --save bench.json
+    python tools/benchmark.py --latency 0.05 --devices 12 --baseline bench.json
+
+--parse-only runs just the parsing benchmark, which needs neither requests
+nor aiohttp.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_nas import MockNAS  # noqa: E402
+import wdmycloud  # noqa: E402
+
+REFRESH_KEYS = ('system_info', 'system_state', 'storage_usage', 'media_status', 'firmware_info')
+
+
+def _stats(samples):
+    samples = sorted(samples)
+    return {
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+    }
+
+
+def bench_calls(nas, iterations):
+    """Latency of each read endpoint through MyCloudClient, uncached"""
+    client = wdmycloud.MyCloudClient(nas.address, cache=False)
+    client.login(*nas.credentials)
+    results = {}
+    for name in wdmycloud.ENDPOINTS:
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            client.fetch(name)
+            samples.append(time.perf_counter() - started)
+        results[name] = _stats(samples)
+    return results
+
+
+async def _refresh(nas, iterations, concurrent):
+    client = wdmycloud.AsyncMyCloudClient(nas.address, cache=False)
+    try:
+        await client.login(*nas.credentials)
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            if concurrent:
+                await asyncio.gather(*(client.fetch(key) for key in REFRESH_KEYS))
+            else:
+                for key in REFRESH_KEYS:
+                    await client.fetch(key)
+            samples.append(time.perf_counter() - started)
+        return _stats(samples)
+    finally:
+        await client.close()
+
+
+def bench_refresh(nas, iterations):
+    """Time to fetch every coordinator endpoint once"""
+    return {
+        'sequential': asyncio.run(_refresh(nas, iterations, False)),
+        'concurrent': asyncio.run(_refresh(nas, iterations, True)),
+    }
+
+
+def _bench_body(endpoint, body, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        endpoint.parse(body)
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    endpoint.parse(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'bytes': len(body), 'peak_kb': peak / 1024, **_stats(samples)}
+
+
+def bench_parse(categories, iterations):
+    """CPU cost and peak memory of parsing each endpoint's mock response.
+
+    media_status is also parsed with 200 and with categories categories.
+    """
+    results = {}
+    with MockNAS() as nas:
+        for name, endpoint in wdmycloud.ENDPOINTS.items():
+            body = nas.read(endpoint.path).encode()
+            results[name] = _bench_body(endpoint, body, iterations)
+        for count in sorted({200, categories}):
+            nas.media_categories = count
+            body = nas.read('mediacrawler_status').encode()
+            results[f'media_status_{count}'] = _bench_body(
+                wdmycloud.ENDPOINTS['media_status'], body, iterations
+            )
+    return results
+
+
+def bench_sweep(devices, workers):
+    """Devices per second for a CLI 'summary' sweep over every mock device"""
+    hosts = ','.join(nas.address for nas in devices)
+    user, password = devices[0].credentials
+    started = time.perf_counter()
+    code = wdmycloud.run_cli(
+        ['summary', '-H', hosts, '-u', user, '-p', password, '-w', str(workers)],
+        out=io.StringIO(),
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        'devices': len(devices),
+        'seconds': elapsed,
+        'devices_per_second': len(devices) / elapsed,
+        'ok': code == 0,
+    }
+
+
+def _compare(results, baseline, threshold):
+    """Return lines for metrics that got slower than baseline by threshold"""
+    regressions = []
+
+    def walk(current, previous, path):
+        for key, value in current.items():
+            if key not in previous:
+                continue
+            if isinstance(value, dict):
+                walk(value, previous[key], f'{path}{key}.')
+            elif key.endswith('_ms') or key == 'seconds':
+                if previous[key] and value > previous[key] * (1 + threshold):
+                    regressions.append(
+                        f'{path}{key}: {previous[key]:.2f} -> {value:.2f} '
+                        f'(+{(value / previous[key] - 1) * 100:.0f}%)'
+                    )
+
+    walk(results, baseline, '')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='seconds each mock response is delayed')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--devices', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--media-categories', type=int, default=2000)
+    parser.add_argument('--parse-only', action='store_true',
+                        help='only measure response parsing')
+    parser.add_argument('--save', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare with results saved by --save')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='slowdown over baseline that counts as a regression')
+    args = parser.parse_args()
+
+    if args.parse_only:
+        results = {'parse': bench_parse(args.media_categories, args.iterations)}
+    else:
+        devices = [MockNAS(latency=args.latency).start() for _ in range(args.devices)]
+        try:
+            results = {
+                'calls': bench_calls(devices[0], args.iterations),
+                'refresh': bench_refresh(devices[0], args.iterations),
+                'parse': bench_parse(args.media_categories, args.iterations),
+                'sweep': bench_sweep(devices, args.workers),
+            }
+        finally:
+            for nas in devices:
+                nas.stop()
+
+    print(json.dumps(results, indent=2))
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as out:
+            json.dump(results, out, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as previous:
+            regressions = _compare(results, json.load(previous), args.threshold)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
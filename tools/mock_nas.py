@@ -0,0 +1,259 @@
+"""Stand-in for a WD MyCloud web server, for development without a device.
+
+Serves the /api/2.1/rest/* endpoints MyCloudClient uses, with knobs for
+response latency, injected errors, session expiry and the size of the
+mediacrawler_status payload. Run it directly to point the integration or
+the CLI at it:
+
+    python tools/mock_nas.py --port 8080 --latency 0.2 --media-categories 500
+"""
+import argparse
+import hashlib
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PATH = '/api/2.1/rest/'
+COOKIE = 'PHPSESSID'
+
+
+class MockNAS:
+    """A threaded HTTP server emulating one NAS.
+
+    latency is added to every response, either in seconds or as a dict of
+    seconds per endpoint. error_rate is the fraction of requests answered
+    with a 500. Sessions expire session_ttl seconds after login, or never
+    when None. media_categories sets how many categories mediacrawler_status
+    reports. With etag set, GET responses carry an ETag and honour
+    If-None-Match.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, error_rate=0,
+                 session_ttl=None, media_categories=3, etag=False,
+                 username='admin', password='admin'):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.session_ttl = session_ttl
+        self.media_categories = media_categories
+        self.etag = etag
+        self.credentials = (username, password)
+        self.requests = Counter()
+        self.led = True
+        self.standby = (True, 10)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self._server.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def expire_sessions(self):
+        """Invalidate every session, as a reboot of the device would"""
+        with self._lock:
+            self._sessions.clear()
+
+    def _login(self, username, password):
+        if (username, password) != self.credentials:
+            return None
+        token = secrets.token_hex(16)
+        with self._lock:
+            self._sessions[token] = time.monotonic()
+        return token
+
+    def _authorized(self, token):
+        with self._lock:
+            started = self._sessions.get(token)
+            if started is None:
+                return False
+            if self.session_ttl is not None and time.monotonic() - started > self.session_ttl:
+                del self._sessions[token]
+                return False
+            return True
+
+    def _delay(self, endpoint):
+        if isinstance(self.latency, dict):
+            return self.latency.get(endpoint, 0)
+        return self.latency
+
+    def read(self, endpoint):
+        """Return the XML body for a GET, or None for an unknown endpoint"""
+        if endpoint == 'device':
+            return ('<device><device_type>sequoia</device_type>'
+                    '<communication_status>online</communication_status>'
+                    '<remote_access>true</remote_access><internal_port>80</internal_port>'
+                    '<internal_ssl_port>443</internal_ssl_port></device>')
+        if endpoint == 'system_information':
+            return ('<system_information><manufacturer>Western Digital Corporation</manufacturer>'
+                    '<model_description>WD My Cloud</model_description><host_name>MockCloud</host_name>'
+                    '<capacity>4TB</capacity><serial_number>WCC0MOCK0001</serial_number>'
+                    '<mac_address>00:90:a9:00:00:01</mac_address></system_information>')
+        if endpoint == 'system_state':
+            return ('<system_state><status>ready</status><temperature>good</temperature>'
+                    '<smart>good</smart><volume>good</volume><free_space>good</free_space>'
+                    '<reported_status>good</reported_status></system_state>')
+        if endpoint == 'storage_usage':
+            return ('<storage_usage><size>3990000000000</size><usage>1234567890123</usage>'
+                    '<video>600000000000</video><photos>300000000000</photos>'
+                    '<music>100000000000</music><other>234567890123</other></storage_usage>')
+        if endpoint == 'mediacrawler_status':
+            categories = ''.join(
+                f'<category><category_type>{_category_name(index)}</category_type>'
+                f'<extracted_count>{index * 7}</extracted_count><total>{index * 10}</total></category>'
+                for index in range(self.media_categories)
+            )
+            return ('<mediacrawler_status><volumes><volume><volume_id>1</volume_id>'
+                    f'<volume_state>idle</volume_state><categories>{categories}</categories>'
+                    '</volume></volumes></mediacrawler_status>')
+        if endpoint == 'led_configuration':
+            return f'<led_configuration><enable_led>{str(self.led).lower()}</enable_led></led_configuration>'
+        if endpoint == 'hdd_standby_time':
+            enabled, minutes = self.standby
+            return (f'<hdd_standby_time><enable_hdd_standby>{str(enabled).lower()}</enable_hdd_standby>'
+                    f'<hdd_standby_time_minutes>{minutes}</hdd_standby_time_minutes></hdd_standby_time>')
+        if endpoint == 'firmware_info':
+            return ('<firmware_info><current_firmware><package><name> MyCloud </name>'
+                    '<version>04.05.00-342</version><description>Core F/W</description>'
+                    '<last_upgrade_time>1600000000</last_upgrade_time></package></current_firmware>'
+                    '<firmware_update_available><available>false</available>'
+                    '</firmware_update_available></firmware_info>')
+        return None
+
+    def write(self, endpoint, params):
+        """Apply a PUT and return whether it succeeded"""
+        if endpoint == 'led_configuration':
+            self.led = params.get('enable_led') == 'true'
+        elif endpoint == 'hdd_standby_time':
+            self.standby = (
+                params.get('enable_hdd_standby') == 'true',
+                int(params.get('hdd_standby_time_minutes', 10)),
+            )
+        elif endpoint == 'shutdown':
+            self.expire_sessions()
+        else:
+            return False
+        return True
+
+
+def _category_name(index):
+    names = ('videos', 'photos', 'music')
+    return names[index] if index < len(names) else f'category_{index}'
+
+
+def _handler(nas):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Send headers and body in one segment so keep-alive clients do not
+        # wait on delayed ACKs, which would swamp the latencies measured
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b'', headers=()):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _token(self):
+            for part in (self.headers.get('Cookie') or '').split(';'):
+                name, _, value = part.strip().partition('=')
+                if name == COOKIE:
+                    return value
+            return None
+
+        def _handle(self):
+            url = urlparse(self.path)
+            if not url.path.startswith(API_PATH):
+                return self._send(404)
+            endpoint = url.path[len(API_PATH):]
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            with nas._lock:
+                nas.requests[endpoint] += 1
+
+            delay = nas._delay(endpoint)
+            if delay:
+                time.sleep(delay)
+            if nas.error_rate and random.random() < nas.error_rate:
+                return self._send(500)
+
+            if endpoint == 'local_login':
+                token = nas._login(params.get('username'), params.get('password'))
+                if token is None:
+                    return self._send(401)
+                return self._send(200, headers=[('Set-Cookie', f'{COOKIE}={token}; path=/')])
+
+            if not nas._authorized(self._token()):
+                return self._send(401)
+
+            if self.command == 'PUT':
+                status = 'success' if nas.write(endpoint, params) else 'failure'
+                return self._send(200, f'<{endpoint}><status>{status}</status></{endpoint}>'.encode())
+
+            body = nas.read(endpoint)
+            if body is None:
+                return self._send(404)
+            body = body.encode()
+            headers = []
+            if nas.etag:
+                tag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get('If-None-Match') == tag:
+                    return self._send(304, headers=[('ETag', tag)])
+                headers.append(('ETag', tag))
+            return self._send(200, body, headers)
+
+        do_GET = _handle
+        do_PUT = _handle
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--session-ttl', type=float)
+    parser.add_argument('--media-categories', type=int, default=3)
+    parser.add_argument('--etag', action='store_true')
+    args = parser.parse_args()
+
+    nas = MockNAS(args.host, args.port, args.latency, args.error_rate,
+                  args.session_ttl, args.media_categories, args.etag)
+    print(f'Mock NAS listening on http://{nas.address} (login admin/admin)')
+    try:
+        nas._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Stress test for sharing one MyCloudClient between many threads.
+
+Runs a mix of get_* and set_* calls from a pool of threads against a mock
+device, which drops every session at random intervals so logins race
+with reads. It then checks the following:
+
+- no call raised
+- every read came back parsed
+- the switches read back what the device holds
+- the client counted every request the device received
+- each session drop led to only a few logins
+
+    python tools/stress.py --threads 32 --seconds 10 --expire-every 0.5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_nas import MockNAS  # noqa: E402
+import wdmycloud  # noqa: E402
+
+READS = ('get_system_state', 'get_storage_usage', 'get_media_status',
+         'get_led_status', 'get_hdd_standby', 'get_firmware_info')
+
+# Logins allowed per dropped session before it counts as a login storm
+LOGINS_PER_EXPIRY = 2
+
+
+def _worker(client, deadline, write_ratio, results, lock):
+    calls = Counter()
+    failures = []
+    while time.monotonic() < deadline:
+        try:
+            if random.random() < write_ratio:
+                if random.random() < 0.5:
+                    name = 'set_led_status'
+                    ok = client.set_led_status(random.random() < 0.5)
+                else:
+                    name = 'set_hdd_standby'
+                    ok = client.set_hdd_standby(random.random() < 0.5, random.choice((10, 20, 30)))
+            else:
+                name = random.choice(READS)
+                ok = getattr(client, name)() is not None
+        except Exception as err:  # Every exception is a finding, not a crash
+            failures.append(f'{name}: {err!r}')
+        else:
+            if not ok:
+                failures.append(f'{name}: no result')
+        calls[name] += 1
+    with lock:
+        results['calls'].update(calls)
+        results['failures'].extend(failures)
+
+
+def _expirer(nas, deadline, every, counter):
+    while time.monotonic() < deadline:
+        # Never back to back: a call whose retry after logging in is rejected
+        # again gives up by design
+        time.sleep(every * random.uniform(0.5, 1.5))
+        nas.expire_sessions()
+        counter['expiries'] += 1
+
+
+def run(threads, seconds, write_ratio, expire_every, latency, cache):
+    results = {'calls': Counter(), 'failures': []}
+    lock = threading.Lock()
+    chaos = Counter()
+    with MockNAS(latency=latency) as nas:
+        client = wdmycloud.MyCloudClient(nas.address, pool_maxsize=threads, cache=cache)
+        client.set_credentials(*nas.credentials)
+        client.login(*nas.credentials)
+
+        deadline = time.monotonic() + seconds
+        workers = [
+            threading.Thread(target=_worker, args=(client, deadline, write_ratio, results, lock))
+            for _ in range(threads)
+        ]
+        if expire_every:
+            workers.append(threading.Thread(target=_expirer, args=(nas, deadline, expire_every, chaos)))
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # Settings read back from the device must match what it holds
+        client.invalidate()
+        checks = {
+            'led_status': client.get_led_status() == nas.led,
+            'hdd_standby': client.get_hdd_standby() == dict(zip(('enabled', 'minutes'), nas.standby)),
+        }
+        sent = {path: stats['requests'] for path, stats in client.stats.as_dict().items()}
+        received = dict(nas.requests)
+
+    logins = received.get('local_login', 0) - 1
+    checks['requests_counted'] = sent == received
+    checks['no_login_storm'] = logins <= max(chaos['expiries'], 1) * LOGINS_PER_EXPIRY
+    checks['no_failures'] = not results['failures']
+    return {
+        'threads': threads,
+        'seconds': seconds,
+        'calls': dict(results['calls']),
+        'calls_per_second': sum(results['calls'].values()) / seconds,
+        'expiries': chaos['expiries'],
+        'logins': logins,
+        'requests': received,
+        'failures': results['failures'][:20],
+        'checks': checks,
+        'ok': all(checks.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2,
+                        help='fraction of calls that are set_* calls')
+    parser.add_argument('--expire-every', type=float, default=0.5,
+                        help='mean seconds between dropped sessions, 0 for never')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='seconds each mock response is delayed')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='send every read to the device')
+    args = parser.parse_args()
+
+    result = run(args.threads, args.seconds, args.write_ratio, args.expire_every,
+                 args.latency, not args.no_cache)
+    print(json.dumps(result, indent=2))
+    return 0 if result['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,287 +1,1229 @@
-import requests
+import argparse
+import asyncio
+import bisect
+import contextlib
+import csv
+import json
+import os
+import random
+import re
+import sys
+import threading
 import xml.etree.ElementTree as ET
 from urllib.parse import urljoin
 import time
 from getpass import getpass
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-class MyCloudClient:
-    def __init__(self, host):
-        """Initialize MyCloud client with host address"""
-        self.host = host if host.startswith('http') else f'http://{host}'
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Accept': 'text/plain, */*; q=0.01',
-            'Accept-Language': 'en',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Referer': f'{self.host}/UI/'
-        })
+try:
+    from .fleet import summarize
+    from .forecast import CapacityForecast
+    from .history import RESOLUTIONS, HistoryStore, safe_name
+except ImportError:  # Run as a script rather than imported from the package
+    from fleet import summarize
+    from forecast import CapacityForecast
+    from history import RESOLUTIONS, HistoryStore, safe_name
 
-    def login(self, username, password):
-        """Login to the MyCloud device"""
-        login_url = urljoin(self.host, f'/api/2.1/rest/local_login')
-        params = {
+try:
+    import aiohttp
+    import yarl
+except ImportError:  # Only needed by AsyncMyCloudClient
+    aiohttp = None
+
+API_PATH = '/api/2.1/rest/'
+
+FORM_HEADERS = {
+    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    'X-Requested-With': 'XMLHttpRequest'
+}
+
+SHUTDOWN_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'}
+
+# Seconds to wait before retrying a failed automatic re-login, doubling
+# up to RELOGIN_BACKOFF_MAX while the device keeps rejecting it
+RELOGIN_BACKOFF = 5
+RELOGIN_BACKOFF_MAX = 300
+
+# (connect, read) timeouts in seconds; a hung NAS must never block forever
+DEFAULT_TIMEOUT = (5, 15)
+
+# Extra attempts for idempotent GETs that fail with a connection error,
+# a timeout or one of RETRY_STATUSES, spaced by jittered exponential backoff
+DEFAULT_RETRIES = 1
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (502, 503, 504)
+
+# Connections kept alive per host; matches the number of endpoints fetched
+# concurrently so parallel requests do not discard pooled connections
+DEFAULT_POOL_MAXSIZE = 5
+
+# Responses with a repeated group that are larger than this are streamed,
+# emptying each occurrence once read, so a huge mediacrawler response never
+# becomes a full tree. Smaller ones are parsed whole, which costs less CPU
+# and, at this size, a few MB of memory at most. Streamed bodies are handed
+# to the pull parser PARSE_CHUNK bytes at a time.
+STREAM_MIN_BYTES = 1 << 20
+PARSE_CHUNK = 16384
+
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _normalize_host(host):
+    """Return host as a base URL"""
+    return host if host.startswith('http') else f'http://{host}'
+
+
+def _default_headers(host):
+    """Headers the MyCloud web UI sends with every request"""
+    return {
+        'Accept': 'text/plain, */*; q=0.01',
+        'Accept-Language': 'en',
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'X-Requested-With': 'XMLHttpRequest',
+        'Referer': f'{host}/UI/'
+    }
+
+
+def _cache_buster():
+    """Return the '_' query parameter the web UI uses to defeat caching"""
+    return {'_': int(time.time() * 1000)}
+
+
+def _is_auth_failure(method, status, body):
+    """Return True if a response means the session is no longer valid.
+
+    An expired session is answered with 401/403, a redirect to the login
+    page, or an empty 200 body depending on firmware. An empty 200 is only
+    trusted for GETs: a write may have been applied, and resending it after
+    logging in again could reboot a device twice.
+    """
+    if status in (401, 403) or (300 <= status < 400 and status != 304):
+        return True
+    return method == 'GET' and status == 200 and not body.strip()
+
+
+class _Field:
+    """One value to pull out of a response.
+
+    path is relative to the document root and follows ElementTree's find(),
+    so a leading './/' matches at any depth. The first match wins.
+    """
+
+    __slots__ = ('key', 'path', 'convert')
+
+    def __init__(self, key, path, convert=None):
+        self.key = key
+        self.path = path
+        self.convert = convert
+
+    def find(self, element):
+        """Return the converted text of the first match under element, or None"""
+        match = element.find(self.path)
+        return None if match is None else _convert(self, match.text)
+
+
+class _Group:
+    """A repeated element collected into {id: {key: value}} under key.
+
+    The repeated element is matched by tag wherever it occurs; fields and
+    id_tag name its direct children, with id_tag identifying each
+    occurrence. With within, only occurrences inside the first element
+    with that tag are collected.
+    """
+
+    def __init__(self, key, tag, id_tag, fields, within=None):
+        self.key = key
+        self.tag = tag
+        self.id_tag = id_tag
+        self.fields = fields
+        self.within = within
+        self._children = [(field.key, field.path, field.convert) for field in fields]
+
+    def reduce(self, element):
+        """Return the id and fields of one occurrence"""
+        item = {}
+        for key, tag, convert in self._children:
+            # findtext gives '' for an empty element, which find().text gives as None
+            text = element.findtext(tag) or None
+            item[key] = text if text is None or convert is None else convert(text)
+        return element.findtext(self.id_tag) or None, item
+
+
+class _Schema:
+    """The fields an endpoint's response is reduced to"""
+
+    def __init__(self, fields, group=None):
+        self.fields = fields
+        self.group = group
+
+
+def _extract(body, schema):
+    """Reduce an XML response to the schema's fields.
+
+    Fields missing from the response are None. Top level fields must not
+    lie inside the group, whose elements are emptied when a large body is
+    streamed. Raises ET.ParseError on malformed XML.
+    """
+    group = schema.group
+    if group is None:
+        root = ET.fromstring(body)
+    elif len(body) <= STREAM_MIN_BYTES:
+        root = ET.fromstring(body)
+        items = _collect_tree(root, group)
+    else:
+        root, items = _collect_stream(body, group)
+    result = {field.key: field.find(root) for field in schema.fields}
+    if group is not None:
+        result[group.key] = items
+    return result
+
+
+def _collect_tree(root, group):
+    """Collect the group's occurrences from a parsed document"""
+    items = {}
+    scope = root if group.within is None else root.find(f'.//{group.within}')
+    if scope is None:
+        return items
+    for element in scope.iter(group.tag):
+        item_id, item = group.reduce(element)
+        if item_id is not None:
+            items.setdefault(item_id, item)
+    return items
+
+
+def _collect_stream(body, group):
+    """Stream a response, reducing each occurrence as soon as it ends.
+
+    Only end events are handled and every occurrence is emptied once it
+    has been read, so thousands of them are never held in full at once.
+    Returns the root and the collected items.
+    """
+    items = {}
+    # (element, id, item) per occurrence ended so far, kept until the
+    # first within element ends; None once it has
+    pending = []
+    element = None
+    for element in _pull_events(body):
+        if element.tag == group.tag:
+            if pending is not None:
+                pending.append((element, *group.reduce(element)))
+            element.clear()
+        elif element.tag == group.within and pending is not None:
+            inside = set(map(id, element.iter(group.tag)))
+            for child, item_id, item in pending:
+                if item_id is not None and id(child) in inside:
+                    items.setdefault(item_id, item)
+            pending = None
+    if group.within is None:
+        for _, item_id, item in pending:
+            if item_id is not None:
+                items.setdefault(item_id, item)
+    # The root element is always the last to end
+    return element, items
+
+
+def _pull_events(body):
+    """Yield elements as they end while feeding the body in PARSE_CHUNK slices"""
+    parser = ET.XMLPullParser(events=('end',))
+    for start in range(0, len(body), PARSE_CHUNK):
+        parser.feed(body[start:start + PARSE_CHUNK])
+        for _, element in parser.read_events():
+            yield element
+    parser.close()
+    for _, element in parser.read_events():
+        yield element
+
+
+def _convert(field, text):
+    if text is None or field.convert is None:
+        return text
+    return field.convert(text)
+
+
+def _is_true(text):
+    return text == 'true'
+
+
+def _number(text):
+    """Parse a numeric reading, keeping text such as 'good' as it is"""
+    if text[:1].isalpha():
+        # Health words are common; skip the two failing conversions
+        return text
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _format_timestamp(text):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(int(text)))
+
+
+def convert_bytes(bytes_value):
+    """Convert bytes to human readable format"""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if bytes_value < 1024:
+            return f"{bytes_value:.2f} {unit}"
+        bytes_value /= 1024
+    return f"{bytes_value:.2f} TB"
+
+
+class Endpoint:
+    """A readable REST resource: where it lives and what to keep from it.
+
+    schema lists the fields extracted from the response, transform
+    post-processes the extracted dict and ttl is how many seconds a
+    response stays fresh.
+    """
+
+    def __init__(self, path, schema, transform=None, ttl=0):
+        self.path = path
+        self.schema = schema
+        self.transform = transform
+        self.ttl = ttl
+
+    def parse(self, body):
+        """Reduce a response body; raises ET.ParseError on malformed XML"""
+        result = _extract(body, self.schema)
+        if self.transform is not None:
+            return self.transform(result)
+        return result
+
+
+STATUS_SCHEMA = _Schema([_Field('status', 'status')])
+
+ENDPOINTS = {
+    'device_info': Endpoint('device', _Schema([
+        _Field('Device Type', 'device_type'),
+        _Field('Communication', 'communication_status'),
+        _Field('Remote Access', 'remote_access'),
+        _Field('Internal Port', 'internal_port'),
+        _Field('SSL Port', 'internal_ssl_port'),
+    ]), ttl=3600),
+    'system_info': Endpoint('system_information', _Schema([
+        _Field('Manufacturer', 'manufacturer'),
+        _Field('Model', 'model_description'),
+        _Field('Host Name', 'host_name'),
+        _Field('Capacity', 'capacity'),
+        _Field('Serial Number', 'serial_number'),
+        _Field('MAC Address', 'mac_address'),
+    ]), ttl=3600),
+    'system_state': Endpoint('system_state', _Schema([
+        _Field('Status', 'status'),
+        _Field('Temperature', 'temperature', _number),
+        _Field('SMART', 'smart'),
+        _Field('Volume', 'volume'),
+        _Field('Free Space', 'free_space', _number),
+        _Field('Overall', 'reported_status'),
+    ]), ttl=5),
+    'media_status': Endpoint('mediacrawler_status', _Schema(
+        [_Field('Volume State', './/volume/volume_state')],
+        group=_Group('Media', 'category', 'category_type', [
+            _Field('Total', 'total', _number),
+            _Field('Processed', 'extracted_count', _number),
+        ], within='volume'),
+    ), ttl=5),
+    'storage_usage': Endpoint('storage_usage', _Schema([
+        _Field('Total Size', 'size', int),
+        _Field('Used Space', 'usage', int),
+        _Field('Video', 'video', int),
+        _Field('Photos', 'photos', int),
+        _Field('Music', 'music', int),
+        _Field('Other', 'other', int),
+    ]), ttl=60),
+    'led_status': Endpoint('led_configuration', _Schema([
+        _Field('enabled', 'enable_led', _is_true),
+    ]), lambda result: result['enabled'], ttl=60),
+    'hdd_standby': Endpoint('hdd_standby_time', _Schema([
+        _Field('enabled', 'enable_hdd_standby', _is_true),
+        _Field('minutes', 'hdd_standby_time_minutes', int),
+    ]), ttl=60),
+    'firmware_info': Endpoint('firmware_info', _Schema([
+        _Field('Firmware Name', './/current_firmware/package/name', str.strip),
+        _Field('Firmware Version', './/current_firmware/package/version'),
+        _Field('Firmware Description', './/current_firmware/package/description'),
+        _Field('Last Upgrade', './/current_firmware/package/last_upgrade_time', _format_timestamp),
+        _Field('Update Available', './/firmware_update_available/available', _is_true),
+    ]), ttl=3600),
+}
+
+
+def _parse_status(body):
+    """Return True if a write response reports success"""
+    try:
+        status = _extract(body, STATUS_SCHEMA)['status']
+    except ET.ParseError:
+        return False
+    return status is not None and status.lower() == 'success'
+
+
+class _CacheEntry:
+    __slots__ = ('value', 'expires', 'etag', 'last_modified')
+
+    def __init__(self, value, expires, etag, last_modified):
+        self.value = value
+        self.expires = expires
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class _EndpointStats:
+    __slots__ = ('statuses', 'errors', 'timeouts', 'bytes', 'latency_sum',
+                 'latency_last', 'buckets', 'parse_sum', 'parses', 'cache_hits',
+                 'coalesced')
+
+    def __init__(self):
+        self.statuses = Counter()
+        self.errors = 0
+        self.timeouts = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        self.latency_last = None
+        # Counts per LATENCY_BUCKETS bound, with a final overflow bucket
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.parse_sum = 0.0
+        self.parses = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    @property
+    def requests(self):
+        return sum(self.buckets)
+
+    def as_dict(self):
+        requests = self.requests
+        return {
+            'requests': requests,
+            'statuses': dict(self.statuses),
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'bytes': self.bytes,
+            'latency_ms_last': None if self.latency_last is None else self.latency_last * 1000,
+            'latency_ms_mean': self.latency_sum / requests * 1000 if requests else None,
+            'latency_buckets': {
+                f'le_{bound}': count for bound, count in zip(LATENCY_BUCKETS + ('inf',), self.buckets)
+            },
+            'parse_ms_mean': self.parse_sum / self.parses * 1000 if self.parses else None,
+            'cache_hits': self.cache_hits,
+            'coalesced': self.coalesced,
+        }
+
+
+class RequestStats:
+    """Counters and latency histograms per REST endpoint path.
+
+    Every request attempt is recorded, retries and logins included, so the
+    figures show what the device was actually asked to do. A request counts
+    as an error when it raised or the device answered with a 4xx or 5xx
+    status; timeouts are counted separately.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        # Blocking clients record from several threads at once
+        self._lock = threading.Lock()
+
+    def _get(self, endpoint):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = _EndpointStats()
+        return stats
+
+    def record(self, endpoint, seconds, status=None, size=0, timeout=False):
+        """Record one request; status is None when no response arrived"""
+        with self._lock:
+            stats = self._get(endpoint)
+            stats.latency_sum += seconds
+            stats.latency_last = seconds
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.bytes += size
+            if status is not None:
+                stats.statuses[status] += 1
+            if timeout:
+                stats.timeouts += 1
+            elif status is None or status >= 400:
+                stats.errors += 1
+
+    def record_parse(self, endpoint, seconds):
+        with self._lock:
+            stats = self._get(endpoint)
+            stats.parse_sum += seconds
+            stats.parses += 1
+
+    def record_cache_hit(self, endpoint):
+        with self._lock:
+            self._get(endpoint).cache_hits += 1
+
+    def record_coalesced(self, endpoint):
+        with self._lock:
+            self._get(endpoint).coalesced += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {endpoint: stats.as_dict() for endpoint, stats in sorted(self.endpoints.items())}
+
+
+def _prometheus_labels(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def prometheus_text(stats):
+    """Render {host: RequestStats} in the Prometheus text exposition format"""
+    families = [
+        ('wdmycloud_requests_total', 'counter', 'Requests sent, by response status'),
+        ('wdmycloud_request_errors_total', 'counter', 'Requests that failed or returned 4xx/5xx'),
+        ('wdmycloud_request_timeouts_total', 'counter', 'Requests that timed out'),
+        ('wdmycloud_response_bytes_total', 'counter', 'Response body bytes received'),
+        ('wdmycloud_request_duration_seconds', 'histogram', 'Time from sending a request to reading its body'),
+        ('wdmycloud_parse_duration_seconds', 'summary', 'Time spent parsing response bodies'),
+        ('wdmycloud_cache_hits_total', 'counter', 'Reads answered from the client cache'),
+        ('wdmycloud_coalesced_total', 'counter', 'Reads that shared a request already in flight'),
+    ]
+    lines = []
+    for name, kind, help_text in families:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for host, host_stats in sorted(stats.items()):
+            for endpoint, item in sorted(host_stats.endpoints.items()):
+                labels = _prometheus_labels(host=host, endpoint=endpoint)
+                if name == 'wdmycloud_requests_total':
+                    for status, count in sorted(item.statuses.items()):
+                        lines.append(f'{name}{{{labels},status="{status}"}} {count}')
+                elif name == 'wdmycloud_request_errors_total':
+                    lines.append(f'{name}{{{labels}}} {item.errors}')
+                elif name == 'wdmycloud_request_timeouts_total':
+                    lines.append(f'{name}{{{labels}}} {item.timeouts}')
+                elif name == 'wdmycloud_response_bytes_total':
+                    lines.append(f'{name}{{{labels}}} {item.bytes}')
+                elif name == 'wdmycloud_request_duration_seconds':
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), item.buckets):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{labels}}} {item.latency_sum:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {cumulative}')
+                elif name == 'wdmycloud_parse_duration_seconds':
+                    lines.append(f'{name}_sum{{{labels}}} {item.parse_sum:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {item.parses}')
+                elif name == 'wdmycloud_cache_hits_total':
+                    lines.append(f'{name}{{{labels}}} {item.cache_hits}')
+                else:
+                    lines.append(f'{name}{{{labels}}} {item.coalesced}')
+    return '\n'.join(lines) + '\n'
+
+
+class _BaseClient:
+    """State shared by the blocking and asyncio clients"""
+
+    def __init__(self, host, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 cache=True):
+        self.host = _normalize_host(host)
+        self.timeout = timeout
+        self.retries = retries
+        # Parsed responses per ENDPOINTS name, reused for the endpoint's ttl
+        # and revalidated with ETag/Last-Modified when the firmware sends them
+        self._cache = {} if cache else None
+        # Reads in progress per ENDPOINTS name, joined by concurrent callers
+        # of the same endpoint instead of sending the request again
+        self._inflight = {}
+        # Bumped per ENDPOINTS name by invalidate, so a read that started
+        # before a write does not cache the value the write replaced
+        self._generations = {}
+        self._credentials = None
+        # Incremented on every successful login so concurrent callers that
+        # hit the same expired session only log in once
+        self.login_generation = 0
+        self.on_login = None
+        # True while the device answers the stored credentials with 401/403
+        self.login_rejected = False
+        self._relogin_delay = RELOGIN_BACKOFF
+        self._relogin_after = 0
+        self.stats = RequestStats()
+        # Optional HistoryStore fed with every freshly parsed value
+        self.history = None
+
+    def _url(self, endpoint):
+        return urljoin(self.host, API_PATH + endpoint)
+
+    def _login_params(self, username, password):
+        return {
             'username': username,
             'password': password,
-            '_': int(time.time() * 1000)
+            **_cache_buster()
         }
-        
-        response = self.session.get(login_url, params=params)
-        if response.status_code == 200:
-            return True
-        return False
 
-    def get_device_info(self):
-        """Get device information"""
-        device_url = urljoin(self.host, '/api/2.1/rest/device')
-        params = {'_': int(time.time() * 1000)}
-        
-        response = self.session.get(device_url, params=params)
+    def set_credentials(self, username, password):
+        """Store credentials used to log in again when the session expires"""
+        self._credentials = (username, password)
+
+    def _login_succeeded(self, username, password):
+        """Record a successful login"""
+        self._credentials = (username, password)
+        self.login_generation += 1
+        self.login_rejected = False
+        self.reset_relogin_backoff()
+        if self.on_login is not None:
+            self.on_login()
+
+    def reset_relogin_backoff(self):
+        """Let the next rejected request log in again straight away"""
+        self._relogin_delay = RELOGIN_BACKOFF
+        self._relogin_after = 0
+
+    def _may_relogin(self):
+        """Return True if stored credentials may be retried now"""
+        return self._credentials is not None and time.monotonic() >= self._relogin_after
+
+    def _relogin_failed(self):
+        """Back off exponentially before the next login attempt"""
+        self._relogin_after = time.monotonic() + self._relogin_delay
+        self._relogin_delay = min(self._relogin_delay * 2, RELOGIN_BACKOFF_MAX)
+
+    def _attempts(self, method):
+        """Number of tries for a request; writes are never repeated"""
+        return self.retries + 1 if method == 'GET' else 1
+
+    def _cached(self, name):
+        """Return the cache entry for name if it is still fresh"""
+        if self._cache is None:
+            return None
+        entry = self._cache.get(name)
+        if entry is not None and entry.expires > time.monotonic():
+            self.stats.record_cache_hit(ENDPOINTS[name].path)
+            return entry
+        return None
+
+    def _conditional_headers(self, name):
+        """Validators from the last response so the device can answer 304"""
+        entry = self._cache.get(name) if self._cache is not None else None
+        if entry is None:
+            return None
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers or None
+
+    def _store(self, name, value, headers):
+        if self._cache is None or value is None:
+            return
+        self._cache[name] = _CacheEntry(
+            value,
+            time.monotonic() + ENDPOINTS[name].ttl,
+            headers.get('ETag'),
+            headers.get('Last-Modified'),
+        )
+
+    def _record(self, name, value):
+        if self.history is not None and value is not None:
+            self.history.record(name, value)
+
+    def _accept(self, name, value, headers, generation):
+        """Cache and record a fresh value unless invalidate ran since the read began"""
+        if self._generations.get(name, 0) != generation:
+            return
+        self._store(name, value, headers)
+        self._record(name, value)
+
+    def _revalidated(self, name):
+        """Renew and return the cached value after a 304 Not Modified"""
+        entry = self._cache.get(name) if self._cache is not None else None
+        if entry is None:
+            return None
+        entry.expires = time.monotonic() + ENDPOINTS[name].ttl
+        self._record(name, entry.value)
+        return entry.value
+
+    def _landed(self, name, flight):
+        """Forget a finished read unless invalidate already replaced it"""
+        if self._inflight.get(name) is flight:
+            del self._inflight[name]
+
+    def invalidate(self, *names):
+        """Drop cached responses for names, or for every endpoint if none given"""
+        # Reads already in flight may predate the change; later callers
+        # start a new one instead of joining them
+        if not names:
+            self._inflight.clear()
+        for name in names:
+            self._inflight.pop(name, None)
+        for name in names or ENDPOINTS:
+            self._generations[name] = self._generations.get(name, 0) + 1
+        if self._cache is None:
+            return
+        if not names:
+            self._cache.clear()
+        for name in names:
+            self._cache.pop(name, None)
+
+    def _parse(self, name, body):
+        """Parse a response for the ENDPOINTS entry called name, timing it"""
+        endpoint = ENDPOINTS[name]
+        started = time.perf_counter()
+        try:
+            return endpoint.parse(body)
+        finally:
+            self.stats.record_parse(endpoint.path, time.perf_counter() - started)
+
+    @staticmethod
+    def _retry_delay(attempt):
+        """Jittered exponential backoff so devices polled together do not retry in step"""
+        return RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+class _Flight:
+    """A blocking read shared by the threads waiting for it"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class MyCloudClient(_BaseClient):
+    """Blocking client built on requests, safe to share between threads.
+
+    requests does not promise that a Session can be used from several
+    threads at once, so each thread gets its own. They share one connection
+    pool, capped at pool_maxsize, and the cookies of the latest login.
+    """
+
+    def __init__(self, host, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 pool_connections=1, pool_maxsize=DEFAULT_POOL_MAXSIZE, cache=True):
+        """Initialize MyCloud client with host address"""
+        # requests is imported on first use: the integration only needs the
+        # asyncio client and should not pay for loading it at startup
+        from requests.adapters import HTTPAdapter
+
+        super().__init__(host, timeout, retries, cache)
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._local = threading.local()
+        # Cookies set by the latest login, copied into each thread's session
+        # the next time that thread sends a request
+        self._cookies = []
+        self._inflight_lock = threading.Lock()
+        self._login_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The calling thread's requests.Session"""
+        local = self._local
+        session = getattr(local, 'session', None)
+        if session is None:
+            import requests
+
+            session = local.session = requests.Session()
+            session.headers.update(_default_headers(self.host))
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            local.generation = None
+        if local.generation != self.login_generation:
+            local.generation = self.login_generation
+            for cookie in self._cookies:
+                session.cookies.set_cookie(cookie)
+        return session
+
+    def invalidate(self, *names):
+        with self._inflight_lock:
+            super().invalidate(*names)
+
+    # Under the lock invalidate holds, so a write on another thread cannot
+    # land between the generation check and caching the value it replaced
+    def _accept(self, name, value, headers, generation):
+        with self._inflight_lock:
+            super()._accept(name, value, headers, generation)
+
+    def _revalidated(self, name):
+        with self._inflight_lock:
+            return super()._revalidated(name)
+
+    def _send(self, method, endpoint, params, headers):
+        import requests
+
+        attempts = self._attempts(method)
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            started = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method, self._url(endpoint), params=params, headers=headers,
+                    timeout=self.timeout, allow_redirects=False
+                )
+            except (requests.ConnectionError, requests.Timeout) as err:
+                self.stats.record(
+                    endpoint, time.perf_counter() - started,
+                    timeout=isinstance(err, requests.Timeout)
+                )
+                if last:
+                    raise
+            else:
+                self.stats.record(
+                    endpoint, time.perf_counter() - started,
+                    response.status_code, len(response.content)
+                )
+                if last or response.status_code not in RETRY_STATUSES:
+                    return response
+            time.sleep(self._retry_delay(attempt))
+
+    def _request(self, method, endpoint, params, headers=None):
+        """Send a request, logging in again once if the session has expired"""
+        generation = self.login_generation
+        response = self._send(method, endpoint, params, headers)
+        if _is_auth_failure(method, response.status_code, response.content) and self._relogin(generation):
+            response = self._send(method, endpoint, params, headers)
+        return response
+
+    def _relogin(self, generation):
+        # Threads that hit the same expired session wait for one login
+        with self._login_lock:
+            if generation != self.login_generation:
+                return True
+            if not self._may_relogin():
+                return False
+            if self.login(*self._credentials):
+                return True
+            self._relogin_failed()
+            return False
+
+    def fetch(self, name):
+        """GET the ENDPOINTS entry called name and return its parsed value.
+
+        Threads asking for the same endpoint at once share one request.
+        """
+        entry = self._cached(name)
+        if entry is not None:
+            return entry.value
+        with self._inflight_lock:
+            flight = self._inflight.get(name)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[name] = _Flight()
+        if not leader:
+            self.stats.record_coalesced(ENDPOINTS[name].path)
+            return flight.wait()
+        try:
+            flight.value = self._fetch(name)
+        except Exception as err:
+            flight.error = err
+            raise
+        finally:
+            with self._inflight_lock:
+                self._landed(name, flight)
+            flight.done.set()
+        return flight.value
+
+    def _fetch(self, name):
+        endpoint = ENDPOINTS[name]
+        generation = self._generations.get(name, 0)
+        response = self._request(
+            'GET', endpoint.path, _cache_buster(), self._conditional_headers(name)
+        )
+        if response.status_code == 304:
+            return self._revalidated(name)
         if response.status_code == 200:
             try:
-                root = ET.fromstring(response.text)
-                info = {
-                    'Device Type': root.find('device_type').text,
-                    'Communication': root.find('communication_status').text,
-                    'Remote Access': root.find('remote_access').text,
-                    'Internal Port': root.find('internal_port').text,
-                    'SSL Port': root.find('internal_ssl_port').text
-                }
-                return info
+                value = self._parse(name, response.content)
             except ET.ParseError:
                 return None
+            self._accept(name, value, response.headers, generation)
+            return value
         return None
 
+    def _put(self, endpoint, params, headers=FORM_HEADERS):
+        """PUT to an endpoint and return whether the device reported success"""
+        response = self._request('PUT', endpoint, params, headers)
+        if response.status_code == 200:
+            return _parse_status(response.content)
+        return False
+
+    def login(self, username, password):
+        """Login to the MyCloud device"""
+        import requests
+
+        started = time.perf_counter()
+        try:
+            response = self.session.get(
+                self._url('local_login'), params=self._login_params(username, password),
+                timeout=self.timeout
+            )
+        except (requests.ConnectionError, requests.Timeout) as err:
+            self.stats.record(
+                'local_login', time.perf_counter() - started,
+                timeout=isinstance(err, requests.Timeout)
+            )
+            raise
+        self.stats.record(
+            'local_login', time.perf_counter() - started,
+            response.status_code, len(response.content)
+        )
+        if response.status_code == 200:
+            # Publish the cookies before the generation that makes other
+            # threads pick them up
+            self._cookies = list(response.cookies)
+            self._login_succeeded(username, password)
+            return True
+        self.login_rejected = response.status_code in (401, 403)
+        return False
+
+    def probe(self):
+        """Return True if the device's web server answers at all.
+
+        Nothing is parsed and no login is attempted, so this also works
+        while the device is still starting up or the session has expired.
+        """
+        import requests
+
+        endpoint = ENDPOINTS['device_info'].path
+        started = time.perf_counter()
+        try:
+            response = self.session.get(
+                self._url(endpoint), params=_cache_buster(), timeout=self.timeout,
+                allow_redirects=False
+            )
+        except (requests.ConnectionError, requests.Timeout) as err:
+            self.stats.record(
+                endpoint, time.perf_counter() - started,
+                timeout=isinstance(err, requests.Timeout)
+            )
+            return False
+        self.stats.record(
+            endpoint, time.perf_counter() - started,
+            response.status_code, len(response.content)
+        )
+        return True
+
+    def get_device_info(self):
+        """Get device information"""
+        return self.fetch('device_info')
+
     def get_system_info(self):
         """Get system information"""
-        info_url = urljoin(self.host, '/api/2.1/rest/system_information')
-        params = {'_': int(time.time() * 1000)}
-        
-        response = self.session.get(info_url, params=params)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                info = {
-                    'Manufacturer': root.find('manufacturer').text,
-                    'Model': root.find('model_description').text,
-                    'Host Name': root.find('host_name').text,
-                    'Capacity': root.find('capacity').text,
-                    'Serial Number': root.find('serial_number').text,
-                    'MAC Address': root.find('mac_address').text
-                }
-                return info
-            except ET.ParseError:
-                return None
-        return None
+        return self.fetch('system_info')
 
     def get_system_state(self):
         """Get system state"""
-        state_url = urljoin(self.host, '/api/2.1/rest/system_state')
-        params = {'_': int(time.time() * 1000)}
-        
-        response = self.session.get(state_url, params=params)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                state = {
-                    'Status': root.find('status').text,
-                    'Temperature': root.find('temperature').text,
-                    'SMART': root.find('smart').text,
-                    'Volume': root.find('volume').text,
-                    'Free Space': root.find('free_space').text,
-                    'Overall': root.find('reported_status').text
-                }
-                return state
-            except ET.ParseError:
-                return None
-        return None
+        return self.fetch('system_state')
 
     def get_media_status(self):
         """Get media crawler status and counts"""
-        media_url = urljoin(self.host, '/api/2.1/rest/mediacrawler_status')
-        params = {'_': int(time.time() * 1000)}
-        
-        response = self.session.get(media_url, params=params)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                volume = root.find('.//volume')
-                media = {}
-                
-                for category in volume.findall('.//category'):
-                    cat_type = category.find('category_type').text
-                    media[cat_type] = {
-                        'Total': category.find('total').text,
-                        'Processed': category.find('extracted_count').text
-                    }
-                
-                return {
-                    'Volume State': volume.find('volume_state').text,
-                    'Media': media
-                }
-            except ET.ParseError:
-                return None
-        return None
+        return self.fetch('media_status')
 
     def convert_bytes(self, bytes_value):
         """Convert bytes to human readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if bytes_value < 1024:
-                return f"{bytes_value:.2f} {unit}"
-            bytes_value /= 1024
-        return f"{bytes_value:.2f} TB"
+        return convert_bytes(bytes_value)
 
     def get_storage_usage(self):
-        """Get storage usage information"""
-        usage_url = urljoin(self.host, '/api/2.1/rest/storage_usage')
-        params = {'_': int(time.time() * 1000)}
-        
-        response = self.session.get(usage_url, params=params)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                usage = {
-                    'Total Size': int(root.find('size').text),
-                    'Used Space': int(root.find('usage').text),
-                    'Video': int(root.find('video').text),
-                    'Photos': int(root.find('photos').text),
-                    'Music': int(root.find('music').text),
-                    'Other': int(root.find('other').text)
-                }
-                
-                # Convert all values to human readable format
-                return {k: self.convert_bytes(v) for k, v in usage.items()}
-            except ET.ParseError:
-                return None
-        return None
+        """Get storage usage information in bytes"""
+        return self.fetch('storage_usage')
 
     def get_led_status(self):
         """Get LED configuration status"""
-        led_url = urljoin(self.host, '/api/2.1/rest/led_configuration')
-        params = {'_': int(time.time() * 1000)}
-        
-        response = self.session.get(led_url, params=params)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                return root.find('enable_led').text == 'true'
-            except ET.ParseError:
-                return None
-        return None
+        return self.fetch('led_status')
 
     def set_led_status(self, enabled):
         """Set LED configuration status"""
-        led_url = urljoin(self.host, '/api/2.1/rest/led_configuration')
-        params = {'enable_led': str(enabled).lower()}
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'X-Requested-With': 'XMLHttpRequest'
-        }
-        
-        response = self.session.put(led_url, params=params, headers=headers)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                return root.find('status').text.lower() == 'success'
-            except ET.ParseError:
-                return False
-        return False
+        result = self._put('led_configuration', {'enable_led': str(enabled).lower()})
+        self.invalidate('led_status')
+        return result
 
     def get_hdd_standby(self):
         """Get HDD standby configuration"""
-        standby_url = urljoin(self.host, '/api/2.1/rest/hdd_standby_time')
-        params = {'_': int(time.time() * 1000)}
-        
-        response = self.session.get(standby_url, params=params)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                return {
-                    'enabled': root.find('enable_hdd_standby').text == 'true',
-                    'minutes': int(root.find('hdd_standby_time_minutes').text)
-                }
-            except ET.ParseError:
-                return None
-        return None
+        return self.fetch('hdd_standby')
 
     def set_hdd_standby(self, enabled, minutes=10):
         """Set HDD standby configuration"""
-        standby_url = urljoin(self.host, '/api/2.1/rest/hdd_standby_time')
         params = {
             'enable_hdd_standby': str(enabled).lower(),
             'hdd_standby_time_minutes': minutes
         }
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'X-Requested-With': 'XMLHttpRequest'
-        }
-        
-        response = self.session.put(standby_url, params=params, headers=headers)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                return root.find('status').text.lower() == 'success'
-            except ET.ParseError:
-                return False
-        return False
+        result = self._put('hdd_standby_time', params)
+        self.invalidate('hdd_standby')
+        return result
 
     def reboot_system(self):
         """Reboot the NAS system"""
-        reboot_url = urljoin(self.host, '/api/2.1/rest/shutdown')
-        params = {'state': 'reboot'}
-        headers = {'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'}
-        
-        response = self.session.put(reboot_url, params=params, headers=headers)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                return root.find('status').text == 'success'
-            except ET.ParseError:
-                return False
-        return False
+        result = self._put('shutdown', {'state': 'reboot'}, SHUTDOWN_HEADERS)
+        self.invalidate()
+        return result
 
     def shutdown_system(self):
         """Shutdown the NAS system"""
-        shutdown_url = urljoin(self.host, '/api/2.1/rest/shutdown')
-        params = {'state': 'halt'}
-        headers = {'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'}
-        
-        response = self.session.put(shutdown_url, params=params, headers=headers)
-        if response.status_code == 200:
-            try:
-                root = ET.fromstring(response.text)
-                return root.find('status').text == 'success'
-            except ET.ParseError:
-                return False
-        return False
+        result = self._put('shutdown', {'state': 'halt'}, SHUTDOWN_HEADERS)
+        self.invalidate()
+        return result
 
     def get_firmware_info(self):
         """Get firmware information"""
-        firmware_url = urljoin(self.host, '/api/2.1/rest/firmware_info')
-        params = {'_': int(time.time() * 1000)}
-        
-        response = self.session.get(firmware_url, params=params)
-        if response.status_code == 200:
+        return self.fetch('firmware_info')
+
+
+class AsyncMyCloudClient(_BaseClient):
+    """asyncio counterpart of MyCloudClient built on aiohttp.
+
+    Pass the integration's aiohttp session so connections are pooled with the
+    rest of Home Assistant; a private session is created otherwise. The
+    session must keep cookies from IP hosts (CookieJar(unsafe=True)) since
+    the NAS authenticates with a session cookie. max_concurrent caps the
+    number of requests in flight against the device at once; the pool
+    itself belongs to the session's connector. budget is an optional
+    semaphore shared with other clients to cap requests across devices.
+    """
+
+    def __init__(self, host, session=None, max_concurrent=None,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, cache=True,
+                 budget=None):
+        """Initialize MyCloud client with host address"""
+        super().__init__(host, timeout, retries, cache)
+        self._headers = _default_headers(self.host)
+        self._session = session
+        self._owns_session = session is None
+        self._limit = (
+            asyncio.Semaphore(max_concurrent) if max_concurrent
+            else contextlib.nullcontext()
+        )
+        self._budget = budget if budget is not None else contextlib.nullcontext()
+        self._login_lock = asyncio.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            if aiohttp is None:
+                raise RuntimeError("aiohttp is required for AsyncMyCloudClient")
+            self._session = aiohttp.ClientSession(
+                cookie_jar=aiohttp.CookieJar(unsafe=True)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the session if this client created it"""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def export_cookies(self):
+        """Return the session cookies for the device as a plain dict"""
+        cookies = self.session.cookie_jar.filter_cookies(yarl.URL(self.host))
+        return {name: morsel.value for name, morsel in cookies.items()}
+
+    def import_cookies(self, cookies):
+        """Reuse session cookies saved by export_cookies"""
+        self.session.cookie_jar.update_cookies(cookies, yarl.URL(self.host))
+
+    def _client_timeout(self, total=None):
+        connect, read = self.timeout
+        return aiohttp.ClientTimeout(total=total, sock_connect=connect, sock_read=read)
+
+    async def _timed(self, endpoint, method, params, headers, total=None, **kwargs):
+        """Send one request and read it, recording it in stats.
+
+        The clock starts once the concurrency limits are acquired, so the
+        latency is the device's and not time spent queued behind others.
+        total, if given, caps this attempt from that point on.
+        """
+        async with self._limit, self._budget:
+            started = time.perf_counter()
+            try:
+                async with self.session.request(
+                    method, self._url(endpoint), params=params,
+                    headers={**self._headers, **(headers or {})},
+                    timeout=self._client_timeout(total), **kwargs
+                ) as response:
+                    body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                self.stats.record(
+                    endpoint, time.perf_counter() - started,
+                    timeout=isinstance(err, asyncio.TimeoutError)
+                )
+                raise
+        self.stats.record(endpoint, time.perf_counter() - started, response.status, len(body))
+        return response.status, response.headers, body
+
+    async def _send_once(self, method, endpoint, params, headers, total=None):
+        return await self._timed(
+            endpoint, method, params, headers, total, allow_redirects=False
+        )
+
+    async def _send(self, method, endpoint, params, headers, total=None):
+        attempts = self._attempts(method)
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                reply = await self._send_once(method, endpoint, params, headers, total)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if last:
+                    raise
+            else:
+                if last or reply[0] not in RETRY_STATUSES:
+                    return reply
+            await asyncio.sleep(self._retry_delay(attempt))
+
+    async def _request(self, method, endpoint, params, headers=None, total=None):
+        """Send a request, logging in again once if the session has expired"""
+        generation = self.login_generation
+        reply = await self._send(method, endpoint, params, headers, total)
+        if _is_auth_failure(method, reply[0], reply[2]) and await self._relogin(generation):
+            reply = await self._send(method, endpoint, params, headers, total)
+        return reply
+
+    async def _relogin(self, generation):
+        async with self._login_lock:
+            if generation != self.login_generation:
+                return True
+            if not self._may_relogin():
+                return False
+            if await self.login(*self._credentials):
+                return True
+            self._relogin_failed()
+            return False
+
+    async def fetch(self, name, total=None):
+        """GET the ENDPOINTS entry called name and return its parsed value.
+
+        total caps each attempt in seconds once it is past the concurrency
+        limits, so time queued behind other requests does not count and a
+        timed out attempt can still be retried. Callers asking for the same
+        endpoint at once share one request. A caller that is cancelled
+        leaves it running for the others.
+        """
+        entry = self._cached(name)
+        if entry is not None:
+            return entry.value
+        task = self._inflight.get(name)
+        if task is None:
+            task = self._inflight[name] = asyncio.ensure_future(self._fetch(name, total))
+            task.add_done_callback(lambda _: self._landed(name, task))
+        else:
+            self.stats.record_coalesced(ENDPOINTS[name].path)
+        return await asyncio.shield(task)
+
+    def _landed(self, name, task):
+        if not task.cancelled():
+            # Mark the error retrieved even if every caller gave up waiting
+            task.exception()
+        super()._landed(name, task)
+
+    async def _fetch(self, name, total=None):
+        endpoint = ENDPOINTS[name]
+        generation = self._generations.get(name, 0)
+        status, headers, body = await self._request(
+            'GET', endpoint.path, _cache_buster(), self._conditional_headers(name), total
+        )
+        if status == 304:
+            return self._revalidated(name)
+        if status == 200:
             try:
-                root = ET.fromstring(response.text)
-                current_firmware = root.find('.//current_firmware/package')
-                update_info = root.find('.//firmware_update_available')
-                
-                info = {
-                    'Firmware Name': current_firmware.find('name').text.strip(),
-                    'Firmware Version': current_firmware.find('version').text,
-                    'Firmware Description': current_firmware.find('description').text,
-                    'Last Upgrade': time.strftime(
-                        '%Y-%m-%d %H:%M:%S',
-                        time.localtime(int(current_firmware.find('last_upgrade_time').text))
-                    ),
-                    'Update Available': update_info.find('available').text == 'true'
-                }
-                return info
+                value = self._parse(name, body)
             except ET.ParseError:
                 return None
+            self._accept(name, value, headers, generation)
+            return value
         return None
 
+    async def _put(self, endpoint, params, headers=FORM_HEADERS):
+        """PUT to an endpoint and return whether the device reported success"""
+        status, _, body = await self._request('PUT', endpoint, params, headers)
+        if status == 200:
+            return _parse_status(body)
+        return False
+
+    async def login(self, username, password):
+        """Login to the MyCloud device"""
+        status, _, _ = await self._timed(
+            'local_login', 'GET', self._login_params(username, password), None
+        )
+        if status != 200:
+            self.login_rejected = status in (401, 403)
+            return False
+        self._login_succeeded(username, password)
+        return True
+
+    async def probe(self):
+        """Return True if the device's web server answers at all.
+
+        Nothing is parsed and no login is attempted, so this also works
+        while the device is still starting up or the session has expired.
+        """
+        try:
+            await self._send_once('GET', ENDPOINTS['device_info'].path, _cache_buster(), None)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+        return True
+
+    async def get_device_info(self):
+        """Get device information"""
+        return await self.fetch('device_info')
+
+    async def get_system_info(self):
+        """Get system information"""
+        return await self.fetch('system_info')
+
+    async def get_system_state(self):
+        """Get system state"""
+        return await self.fetch('system_state')
+
+    async def get_media_status(self):
+        """Get media crawler status and counts"""
+        return await self.fetch('media_status')
+
+    async def get_storage_usage(self):
+        """Get storage usage information in bytes"""
+        return await self.fetch('storage_usage')
+
+    async def get_led_status(self):
+        """Get LED configuration status"""
+        return await self.fetch('led_status')
+
+    async def set_led_status(self, enabled):
+        """Set LED configuration status"""
+        result = await self._put('led_configuration', {'enable_led': str(enabled).lower()})
+        self.invalidate('led_status')
+        return result
+
+    async def get_hdd_standby(self):
+        """Get HDD standby configuration"""
+        return await self.fetch('hdd_standby')
+
+    async def set_hdd_standby(self, enabled, minutes=10):
+        """Set HDD standby configuration"""
+        params = {
+            'enable_hdd_standby': str(enabled).lower(),
+            'hdd_standby_time_minutes': minutes
+        }
+        result = await self._put('hdd_standby_time', params)
+        self.invalidate('hdd_standby')
+        return result
+
+    async def reboot_system(self):
+        """Reboot the NAS system"""
+        result = await self._put('shutdown', {'state': 'reboot'}, SHUTDOWN_HEADERS)
+        self.invalidate()
+        return result
+
+    async def shutdown_system(self):
+        """Shutdown the NAS system"""
+        result = await self._put('shutdown', {'state': 'halt'}, SHUTDOWN_HEADERS)
+        self.invalidate()
+        return result
+
+    async def get_firmware_info(self):
+        """Get firmware information"""
+        return await self.fetch('firmware_info')
+
 def display_menu():
     """Display the main menu options"""
     print("\nWD MyCloud Meny")
@@ -318,7 +1260,7 @@ def handle_menu(client, choice):
         if storage:
             print("\nStorage Usage:")
             for key, value in storage.items():
-                print(f"{key}: {value}")
+                print(f"{key}: {convert_bytes(value) if value is not None else value}")
     
     elif choice == "4":
         media_status = client.get_media_status()
@@ -389,7 +1331,248 @@ def handle_menu(client, choice):
     
     return True  # Continue program
 
-def main():
+def _read_inventory(path):
+    """Read 'host [username [password]]' lines, skipping blanks and # comments"""
+    devices = []
+    with open(path, encoding='utf-8') as inventory:
+        for line in inventory:
+            fields = line.split('#', 1)[0].split()
+            if fields:
+                devices.append((fields + [None, None])[:3])
+    return devices
+
+
+def _flatten(data, prefix=''):
+    """Flatten nested dicts into 'Parent.Child' keys for CSV output"""
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}.'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def _switch_command(getter, setter):
+    """Read a setting, or write it when 'on'/'off' is given"""
+    def command(client, args):
+        if args.value is None:
+            return getter(client)
+        return {'success': setter(client, args.value == 'on', args)}
+    return command
+
+
+def _reboot(client, args):
+    return {'success': client.reboot_system()}
+
+
+CLI_COMMANDS = {
+    'info': lambda client, args: client.get_system_info(),
+    'state': lambda client, args: client.get_system_state(),
+    'storage': lambda client, args: client.get_storage_usage(),
+    'media': lambda client, args: client.get_media_status(),
+    'firmware': lambda client, args: client.get_firmware_info(),
+    'led': _switch_command(
+        lambda client: {'enabled': client.get_led_status()},
+        lambda client, enabled, args: client.set_led_status(enabled),
+    ),
+    'standby': _switch_command(
+        lambda client: client.get_hdd_standby(),
+        lambda client, enabled, args: client.set_hdd_standby(enabled, args.minutes),
+    ),
+    'reboot': _reboot,
+    'summary': lambda client, args: {
+        'system_state': client.get_system_state(),
+        'storage_usage': client.get_storage_usage(),
+    },
+}
+
+
+def _run_device(device, args, stats=None):
+    """Log in to one device and run the command, returning an output row.
+
+    The client's RequestStats are put in stats under the host if given.
+    """
+    host, username, password = device
+    row = {'host': host, 'ok': False, 'error': None}
+    try:
+        client = MyCloudClient(host, timeout=(DEFAULT_TIMEOUT[0], args.timeout), retries=args.retries)
+        if stats is not None:
+            stats[host] = client.stats
+        if args.history:
+            client.history = _history_store(args.history, host)
+        if not client.login(username or args.username, password or args.password):
+            row['error'] = 'login failed'
+            return row
+        result = CLI_COMMANDS[args.command](client, args)
+        if client.history is not None:
+            client.history.flush()
+    except Exception as err:  # Report per host instead of aborting the sweep
+        # requests puts the login URL, password included, in its messages
+        message = re.sub(r'password=[^&\s]*', 'password=***', str(err))
+        row['error'] = f'{type(err).__name__}: {message}'
+        return row
+    # Commands reading several endpoints return a dict of Nones when all fail
+    if result is None or (isinstance(result, dict) and result
+                          and all(value is None for value in result.values())):
+        row['error'] = 'no data'
+    else:
+        row['ok'] = True
+        row.update(result if isinstance(result, dict) else {'value': result})
+    return row
+
+
+def _history_store(directory, host):
+    """Open the history kept for host under directory"""
+    store = HistoryStore(os.path.join(directory, safe_name(host)))
+    store.load()
+    return store
+
+
+def _history_rows(devices, args):
+    """Rows of saved buckets for every device, read without contacting it"""
+    start = time.time() - args.since * 3600 if args.since else None
+    rows = []
+    for host, _, _ in devices:
+        store = _history_store(args.history, host)
+        for series in args.series or store.series:
+            for bucket in store.query(series, args.resolution, start):
+                rows.append({'host': host, 'series': series, **bucket})
+    return rows
+
+
+def _forecast_rows(devices, args):
+    """Fill rates and days until full for every device, from its saved history"""
+    rows = []
+    for host, _, _ in devices:
+        forecast = CapacityForecast()
+        forecast.seed(_history_store(args.history, host))
+        full_date = forecast.full_date
+        rows.append({
+            'host': host,
+            'days_until_full': forecast.days_until_full,
+            'full_date': (
+                time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(full_date))
+                if full_date is not None else None
+            ),
+            'rates': forecast.as_dict()['rates'],
+        })
+    return rows
+
+
+def _write_rows(rows, fmt, out):
+    if fmt == 'json':
+        json.dump(rows, out, indent=2, default=str)
+        out.write('\n')
+    elif fmt == 'csv':
+        flat = [_flatten(row) for row in rows]
+        columns = list(dict.fromkeys(key for row in flat for key in row))
+        writer = csv.DictWriter(out, columns)
+        writer.writeheader()
+        writer.writerows(flat)
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(
+        description='Query or control one or more WD MyCloud devices in parallel. '
+                    'Run without arguments for the interactive menu.'
+    )
+    parser.add_argument('command', choices=sorted([*CLI_COMMANDS, 'history', 'forecast']))
+    parser.add_argument('value', nargs='?', choices=['on', 'off'],
+                        help="new state for 'led' and 'standby'")
+    parser.add_argument('-H', '--host', action='append', default=[],
+                        help='device address; repeat or comma-separate for several')
+    parser.add_argument('-i', '--inventory',
+                        help="file of 'host [username [password]]' lines")
+    parser.add_argument('-u', '--username', default='admin')
+    parser.add_argument('-p', '--password', default=os.environ.get('WDMYCLOUD_PASSWORD'),
+                        help='defaults to $WDMYCLOUD_PASSWORD, prompted for if unset')
+    parser.add_argument('-f', '--format', choices=['json', 'ndjson', 'csv'], default='json')
+    parser.add_argument('-w', '--workers', type=int, default=16,
+                        help='devices queried at the same time')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT[1])
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+    parser.add_argument('--minutes', type=int, default=10,
+                        help="standby time for 'standby on'")
+    parser.add_argument('--yes', action='store_true', help="confirm 'reboot'")
+    parser.add_argument('--history', metavar='DIR',
+                        help="keep readings in a history per device under DIR; "
+                             "'history' reads it back and 'forecast' projects it")
+    parser.add_argument('--series', action='append',
+                        help="series for 'history', e.g. temperature or used_space; "
+                             "repeat for several, default all")
+    parser.add_argument('--resolution', type=int, choices=[res for res, _ in RESOLUTIONS],
+                        help="bucket seconds for 'history', default the finest covering --since")
+    parser.add_argument('--since', type=float, help="hours of 'history' to show")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write per-endpoint request metrics in Prometheus text "
+                             "format to FILE, or to standard error for '-'")
+    return parser
+
+
+def run_cli(argv, out=sys.stdout):
+    """Run one command against every device; returns the process exit code"""
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    devices = [[host, None, None] for hosts in args.host for host in hosts.split(',') if host]
+    if args.inventory:
+        devices.extend(_read_inventory(args.inventory))
+    if not devices:
+        parser.error('no devices given; use --host or --inventory')
+    if args.command == 'reboot' and not args.yes:
+        parser.error("'reboot' needs --yes")
+    if args.command in ('history', 'forecast'):
+        if not args.history:
+            parser.error(f"'{args.command}' needs --history")
+        if args.command == 'history':
+            rows = _history_rows(devices, args)
+        else:
+            rows = _forecast_rows(devices, args)
+        if args.format == 'ndjson':
+            for row in rows:
+                out.write(json.dumps(row) + '\n')
+        _write_rows(rows, args.format, out)
+        return 0
+    if args.password is None and any(password is None for _, _, password in devices):
+        args.password = getpass('Password: ')
+
+    rows = []
+    stats = {} if args.metrics else None
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(devices)))) as pool:
+        futures = [pool.submit(_run_device, device, args, stats) for device in devices]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            if args.format == 'ndjson':
+                out.write(json.dumps(row, default=str) + '\n')
+                out.flush()
+
+    # Keep the order devices were given in rather than completion order
+    order = {device[0]: index for index, device in enumerate(devices)}
+    rows.sort(key=lambda row: order[row['host']])
+    if args.command == 'summary':
+        rows = [{'host': '*', 'ok': True, 'error': None, **summarize(
+            {row['host']: {key: row.get(key) for key in ('system_state', 'storage_usage')}
+             if row['ok'] else None for row in rows}
+        )}] + rows
+        if args.format == 'ndjson':
+            out.write(json.dumps(rows[0], default=str) + '\n')
+    _write_rows(rows, args.format, out)
+
+    if args.metrics == '-':
+        sys.stderr.write(prometheus_text(stats))
+    elif args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as metrics:
+            metrics.write(prometheus_text(stats))
+    return 0 if all(row['ok'] for row in rows) else 1
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run_cli(argv)
+
     print("WD MyCloud NAS Client")
     print("--------------------")
     
@@ -415,4 +1598,4 @@ def main():
         print("\nLogin failed")
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())